@@ -1,8 +1,94 @@
-import uuid
+import contextlib
+import io
+
+
+class DotWriter:
+    """Escreve o grafo da AST em DOT diretamente para um stream.
+
+    Os ids dos nós são sequenciais (n0, n1, ...), por isso o mesmo programa
+    produz sempre o mesmo ficheiro .dot.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.next_id = 0
+        stream.write("digraph {\n")
+
+    def new_id(self):
+        node_id = f"n{self.next_id}"
+        self.next_id += 1
+        return node_id
+
+    def node(self, node_id, label):
+        label = label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        self.stream.write(f'\t{node_id} [label="{label}"]\n')
+
+    def edge(self, tail, head):
+        self.stream.write(f"\t{tail} -> {head}\n")
+
+    def close(self):
+        self.stream.write("}\n")
+
+
+def write_dot(tree, stream):
+    """Escreve o grafo DOT da AST `tree` em `stream`."""
+    dot = DotWriter(stream)
+    tree.graphviz(dot)
+    dot.close()
+
+
+def render_dot(dot_path, format='png'):
+    """Converte um ficheiro .dot (ex.: ast_graph.dot -> ast_graph.png) com o executável `dot`."""
+    import graphviz
+    outfile = f"{dot_path[:-len('.dot')] if dot_path.endswith('.dot') else dot_path}.{format}"
+    return graphviz.render('dot', format, dot_path, outfile=outfile)
+
+
 class Node:
-    pass
+    # Posição no código fonte (linha e coluna, a partir de 1) registada pelo parser;
+    # None nos nós criados pelas otimizações sem correspondência direta no fonte
+    __slots__ = ('lineno', 'column')
+
+    def __new__(cls, *args, **kwargs):
+        node = super().__new__(cls)
+        node.lineno = None
+        node.column = None
+        return node
+
+
+def copy_position(node, source):
+    """Dá a `node` a posição de `source` (ex.: o literal que resulta de dobrar uma expressão)."""
+    node.lineno = source.lineno
+    node.column = source.column
+    return node
+
+
+# Nomes dos slots de cada classe de nó, de toda a hierarquia, calculados uma vez
+_slot_names = {}
+
+
+def iter_nodes(tree):
+    """Percorre todos os nós de `tree` (um nó ou uma lista), em pré-ordem e sem recursão.
+
+    Os filhos são os valores dos `__slots__` de toda a hierarquia da classe (e do
+    `__dict__`, numa subclasse sem `__slots__`).
+    """
+    stack = [tree]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, list):
+            stack.extend(reversed(obj))
+        elif isinstance(obj, Node):
+            yield obj
+            names = _slot_names.get(obj.__class__)
+            if names is None:
+                names = _slot_names[obj.__class__] = [name for klass in obj.__class__.__mro__
+                                                      for name in getattr(klass, '__slots__', ())]
+            children = [getattr(obj, name, None) for name in names]
+            children.extend(getattr(obj, '__dict__', {}).values())
+            stack.extend(reversed(children))
 
 class Program(Node):
+    __slots__ = ('name', 'block')
     def __init__(self, name, block):
         self.name = name
         self.block = block
@@ -11,15 +97,18 @@ class Program(Node):
         return f"Program({self.name}, {self.block})"
     
     def graphviz(self, dot=None, parent_id=None):
-        import graphviz
         if dot is None:
-            dot = graphviz.Digraph()
-        node_id = str(uuid.uuid4())
+            import graphviz
+            buffer = io.StringIO()
+            write_dot(self, buffer)
+            return graphviz.Source(buffer.getvalue())
+        node_id = dot.new_id()
         dot.node(node_id, f"Program: {self.name}")
         self.block.graphviz(dot, node_id)
         return dot
 
 class Block(Node):
+    __slots__ = ('declarations', 'compound_statement')
     def __init__(self, declarations, compound_statement):
         self.declarations = declarations
         self.compound_statement = compound_statement
@@ -28,7 +117,7 @@ class Block(Node):
         return f"Block(declarations={self.declarations}, statements={self.compound_statement})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "Block")
         dot.edge(parent_id, node_id)
         for decl in self.declarations:
@@ -37,11 +126,12 @@ class Block(Node):
         return dot
 
 class VarDeclarations(Node):
+    __slots__ = ('declarations',)
     def __init__(self, declarations):
         self.declarations = declarations
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "VarDeclarations")
         dot.edge(parent_id, node_id)
         for decl in self.declarations:
@@ -52,6 +142,7 @@ class VarDeclarations(Node):
         return f"VarDeclarations({self.declarations})"
 
 class VarDeclaration(Node):
+    __slots__ = ('names', 'type')
     def __init__(self, names, type):
         self.names = names
         self.type = type
@@ -60,14 +151,14 @@ class VarDeclaration(Node):
         return f"VarDeclaration(names={self.names}, type={self.type})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"VarDeclaration: {', '.join(self.names)}")
         dot.edge(parent_id, node_id)
 
         if isinstance(self.type, Node):
             self.type.graphviz(dot, node_id)
         else:
-            type_id = str(uuid.uuid4())
+            type_id = dot.new_id()
             dot.node(type_id, f"Type: {self.type}")
             dot.edge(node_id, type_id)
 
@@ -75,6 +166,7 @@ class VarDeclaration(Node):
 
 
 class Type(Node):
+    __slots__ = ('name',)
     def __init__(self, name):
         self.name = name
     
@@ -82,12 +174,13 @@ class Type(Node):
         return f"Type({self.name})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"Type: {self.name}")
         dot.edge(parent_id, node_id)
         return dot
 
 class Compound(Node):
+    __slots__ = ('statements',)
     def __init__(self, statements):
         self.statements = statements
     
@@ -95,7 +188,7 @@ class Compound(Node):
         return f"Compound({self.statements})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "Compound")
         dot.edge(parent_id, node_id)
         for stmt in self.statements:
@@ -103,6 +196,7 @@ class Compound(Node):
         return dot
 
 class Assignment(Node):
+    __slots__ = ('left', 'right')
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -111,7 +205,7 @@ class Assignment(Node):
         return f"Assignment({self.left} := {self.right})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "Assignment")
         dot.edge(parent_id, node_id)
         self.left.graphviz(dot, node_id)
@@ -119,6 +213,7 @@ class Assignment(Node):
         return dot
 
 class Variable(Node):
+    __slots__ = ('name',)
     def __init__(self, name):
         self.name = name
     
@@ -126,12 +221,13 @@ class Variable(Node):
         return f"Variable({self.name})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"Variable: {self.name}")
         dot.edge(parent_id, node_id)
         return dot
 
 class ProcedureCall(Node):
+    __slots__ = ('name', 'args')
     def __init__(self, name, args):
         self.name = name
         self.args = args
@@ -140,7 +236,7 @@ class ProcedureCall(Node):
         return f"ProcedureCall({self.name}, {self.args})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"ProcedureCall: {self.name}")
         dot.edge(parent_id, node_id)
         for arg in self.args:
@@ -148,6 +244,7 @@ class ProcedureCall(Node):
         return dot
 
 class FunctionCall(Node):
+    __slots__ = ('name', 'args')
     def __init__(self, name, args):
         self.name = name.lower()  # Normaliza o nome
         self.args = args
@@ -156,7 +253,7 @@ class FunctionCall(Node):
         return f"FunctionCall({self.name}, args={self.args})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"FunctionCall: {self.name.upper()}")
         dot.edge(parent_id, node_id)
         for arg in self.args:
@@ -172,6 +269,7 @@ class FunctionCall(Node):
                 arg.pretty_print(indent + 2)
 
 class IfStatement(Node):
+    __slots__ = ('condition', 'then_part', 'else_part')
     def __init__(self, condition, then_part, else_part=None):
         self.condition = condition
         self.then_part = then_part
@@ -181,25 +279,25 @@ class IfStatement(Node):
         return f"If({self.condition}, then={self.then_part}, else={self.else_part})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "IfStatement")
         dot.edge(parent_id, node_id)
         
         # Condition
-        cond_id = str(uuid.uuid4())
+        cond_id = dot.new_id()
         dot.node(cond_id, "Condition")
         dot.edge(node_id, cond_id)
         self.condition.graphviz(dot, cond_id)
         
         # Then part
-        then_id = str(uuid.uuid4())
+        then_id = dot.new_id()
         dot.node(then_id, "Then")
         dot.edge(node_id, then_id)
         self.then_part.graphviz(dot, then_id)
         
         # Else part if exists
         if self.else_part:
-            else_id = str(uuid.uuid4())
+            else_id = dot.new_id()
             dot.node(else_id, "Else")
             dot.edge(node_id, else_id)
             self.else_part.graphviz(dot, else_id)
@@ -207,6 +305,7 @@ class IfStatement(Node):
         return dot
 
 class WhileStatement(Node):
+    __slots__ = ('condition', 'body')
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
@@ -215,18 +314,18 @@ class WhileStatement(Node):
         return f"While({self.condition}, do={self.body})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "WhileStatement")
         dot.edge(parent_id, node_id)
         
         # Condition
-        cond_id = str(uuid.uuid4())
+        cond_id = dot.new_id()
         dot.node(cond_id, "Condition")
         dot.edge(node_id, cond_id)
         self.condition.graphviz(dot, cond_id)
         
         # Body
-        body_id = str(uuid.uuid4())
+        body_id = dot.new_id()
         dot.node(body_id, "Body")
         dot.edge(node_id, body_id)
         self.body.graphviz(dot, body_id)
@@ -234,6 +333,7 @@ class WhileStatement(Node):
         return dot
 
 class ForStatement(Node):
+    __slots__ = ('var_name', 'start_value', 'end_value', 'body', 'direction')
     def __init__(self, var_name, start_value, end_value, body, direction):
         self.var_name = var_name
         self.start_value = start_value
@@ -245,24 +345,24 @@ class ForStatement(Node):
         return f"For({self.var_name} from {self.start_value} to {self.end_value}, do={self.body})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"ForStatement: {self.var_name} ({self.direction})")
         dot.edge(parent_id, node_id)
         
         # Start value
-        start_id = str(uuid.uuid4())
+        start_id = dot.new_id()
         dot.node(start_id, "Start")
         dot.edge(node_id, start_id)
         self.start_value.graphviz(dot, start_id)
         
         # End value
-        end_id = str(uuid.uuid4())
+        end_id = dot.new_id()
         dot.node(end_id, "End")
         dot.edge(node_id, end_id)
         self.end_value.graphviz(dot, end_id)
         
         # Body
-        body_id = str(uuid.uuid4())
+        body_id = dot.new_id()
         dot.node(body_id, "Body")
         dot.edge(node_id, body_id)
         self.body.graphviz(dot, body_id)
@@ -270,6 +370,7 @@ class ForStatement(Node):
         return dot
 
 class BinaryOp(Node):
+    __slots__ = ('left', 'op', 'right')
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
@@ -279,7 +380,7 @@ class BinaryOp(Node):
         return f"BinaryOp({self.left} {self.op} {self.right})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"BinaryOp: {self.op}")
         dot.edge(parent_id, node_id)
         self.left.graphviz(dot, node_id)
@@ -287,6 +388,7 @@ class BinaryOp(Node):
         return dot
 
 class UnaryOp(Node):
+    __slots__ = ('op', 'expr')
     def __init__(self, op, expr):
         self.op = op
         self.expr = expr
@@ -295,13 +397,14 @@ class UnaryOp(Node):
         return f"UnaryOp({self.op}{self.expr})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"UnaryOp: {self.op}")
         dot.edge(parent_id, node_id)
         self.expr.graphviz(dot, node_id)
         return dot
 
 class Number(Node):
+    __slots__ = ('value',)
     def __init__(self, value):
         self.value = value
     
@@ -309,12 +412,13 @@ class Number(Node):
         return f"Number({self.value})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"Number: {self.value}")
         dot.edge(parent_id, node_id)
         return dot
 
 class String(Node):
+    __slots__ = ('value',)
     def __init__(self, value):
         self.value = value
     
@@ -322,12 +426,13 @@ class String(Node):
         return f"String('{self.value}')"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"String: '{self.value}'")
         dot.edge(parent_id, node_id)
         return dot
     
 class CharLiteral(Node):
+    __slots__ = ('value',)
     def __init__(self, value):
         self.value = value
     
@@ -335,12 +440,13 @@ class CharLiteral(Node):
         return f"CharLiteral('{self.value}')"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"Char: '{self.value}'")
         dot.edge(parent_id, node_id)
         return dot
 
 class ArrayAccess(Node):
+    __slots__ = ('array', 'index')
     def __init__(self, array, index):
         self.array = array
         self.index = index
@@ -349,7 +455,7 @@ class ArrayAccess(Node):
         return f"ArrayAccess({self.array}[{self.index}])"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "ArrayAccess")
         dot.edge(parent_id, node_id)
         self.array.graphviz(dot, node_id)
@@ -357,17 +463,19 @@ class ArrayAccess(Node):
         return dot
 
 class NoOp(Node):
+    __slots__ = ()
     def __repr__(self):
         return "NoOp()"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "NoOp")
         if parent_id is not None:
             dot.edge(parent_id, node_id)
         return dot
     
 class Boolean(Node):
+    __slots__ = ('value',)
     def __init__(self, value):
         self.value = value
     
@@ -375,13 +483,14 @@ class Boolean(Node):
         return f"Boolean({self.value})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, f"Boolean: {self.value}")
         if parent_id is not None:
             dot.edge(parent_id, node_id)
         return dot
     
 class ArrayType(Node):
+    __slots__ = ('index_range', 'element_type')
     def __init__(self, index_range, element_type):
         self.index_range = index_range
         self.element_type = element_type
@@ -390,7 +499,7 @@ class ArrayType(Node):
         return f"ArrayType[{self.index_range} of {self.element_type}]"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "ArrayType")
         if parent_id:
             dot.edge(parent_id, node_id)
@@ -400,13 +509,14 @@ class ArrayType(Node):
         if isinstance(self.element_type, Node):
             self.element_type.graphviz(dot, node_id)
         else:
-            elem_id = str(uuid.uuid4())
+            elem_id = dot.new_id()
             dot.node(elem_id, f"ElementType: {self.element_type}")
             dot.edge(node_id, elem_id)
 
         return dot
 
 class IndexRange(Node):
+    __slots__ = ('lower', 'upper')
     def __init__(self, lower, upper):
         self.lower = lower
         self.upper = upper
@@ -415,7 +525,7 @@ class IndexRange(Node):
         return f"IndexRange({self.lower}..{self.upper})"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "IndexRange")
         if parent_id:
             dot.edge(parent_id, node_id)
@@ -424,6 +534,7 @@ class IndexRange(Node):
         return dot
 
 class ReadlnAssignment(Node):
+    __slots__ = ('target',)
     def __init__(self, target):
         self.target = target  # Pode ser None (readln sem argumentos)
     
@@ -433,7 +544,7 @@ class ReadlnAssignment(Node):
         return "ReadlnAssignment()"
     
     def graphviz(self, dot, parent_id):
-        node_id = str(uuid.uuid4())
+        node_id = dot.new_id()
         dot.node(node_id, "Readln")
         if parent_id:
             dot.edge(parent_id, node_id)
@@ -568,4 +679,11 @@ def pretty_print_ast(node, indent=0):
             print(f"{spaces}  (no target)")
     else:
         print(f"{spaces}Unknown node type: {type(node)}")
-        
\ No newline at end of file
+
+
+def format_ast(node):
+    """Devolve como texto o que pretty_print_ast escreveria para `node`."""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        pretty_print_ast(node)
+    return buffer.getvalue()
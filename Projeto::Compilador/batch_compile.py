@@ -0,0 +1,143 @@
+"""Compilação em batch de vários ficheiros Pascal num conjunto de processos."""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+class CompileResult:
+    def __init__(self, source, output, elapsed, instructions=0, error=None, cached=False, artifacts=()):
+        self.source = source
+        # Código EWVM (<nome>.txt), ou None se não foi pedido ou a compilação falhou
+        self.output = output
+        self.elapsed = elapsed
+        self.instructions = instructions
+        self.error = error
+        self.cached = cached
+        # Todos os ficheiros escritos (.dot, .png, .txt, .ewvb), pela ordem em que o foram
+        self.artifacts = list(artifacts)
+
+
+def collect_sources(paths):
+    """Expande diretórios nos ficheiros .pas que contêm (por ordem alfabética).
+
+    Devolve pares (fonte, nome): o nome é o caminho relativo ao diretório dado, ou
+    só o nome do ficheiro quando este é dado diretamente, e é reproduzido no
+    diretório de saída (`tests/a/prog.pas` dá `<saída>/a/prog.txt`).
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                sources.extend((os.path.join(root, name), os.path.relpath(os.path.join(root, name), path))
+                               for name in sorted(files) if name.lower().endswith('.pas'))
+        else:
+            sources.append((path, os.path.basename(path)))
+    return sources
+
+
+def check_output_names(sources):
+    """Levanta ValueError se duas fontes fossem escritas nas mesmas saídas."""
+    seen = {}
+    for source, name in sources:
+        stem = os.path.normcase(os.path.splitext(os.path.normpath(name))[0])
+        if stem in seen:
+            raise ValueError(f"'{seen[stem]}' and '{source}' would both be compiled to '{os.path.splitext(name)[0]}.*'")
+        seen[stem] = source
+
+
+def output_path(name, output_dir, extension='.txt'):
+    stem = os.path.splitext(name)[0]
+    return os.path.join(output_dir, stem + extension)
+
+
+def _write_binary(code_path, binary_path):
+    """Escreve `binary_path` (formato de ewvm_binary) a partir do código em `code_path`."""
+    import ewvm_binary
+    with open(code_path, 'r', encoding='utf-8') as code_file:
+        binary = ewvm_binary.encode(code_file.read())
+    with open(binary_path, 'wb') as binary_file:
+        binary_file.write(binary)
+    return binary_path
+
+
+def compile_file(source, output_dir, opt_level=0, emit=('code',), use_cache=True, range_checks=False, name=None):
+    import ast_nodes as ast
+    from compile_cache import CompileCache
+
+    name = name or os.path.basename(source)
+    output = output_path(name, output_dir)
+    start = time.perf_counter()
+    instructions = 0
+    artifacts = []
+    try:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(source, 'r', encoding='utf-8') as file:
+            data = file.read()
+        cache = CompileCache() if use_cache and set(emit) <= {'code', 'bin'} else None
+        if cache is not None:
+            key = cache.key(data, opt_level, range_checks)
+            entry = cache.get(key)
+            if entry is not None:
+                with open(output, 'w', encoding='utf-8') as output_file:
+                    output_file.write(entry.code)
+                artifacts.append(output)
+                if 'bin' in emit:
+                    artifacts.append(_write_binary(output, output_path(name, output_dir, '.ewvb')))
+                return CompileResult(source, output, time.perf_counter() - start, cached=True, artifacts=artifacts)
+        # Importado só quando é preciso compilar: cada processo do pool constrói o seu parser
+        from yacc_pas import parse_source, write_code
+        tree = parse_source(data, opt_level)
+        if 'dot' in emit or 'png' in emit:
+            dot_path = output_path(name, output_dir, '.dot')
+            with open(dot_path, 'w', encoding='utf-8') as dot_file:
+                ast.write_dot(tree, dot_file)
+            artifacts.append(dot_path)
+            if 'png' in emit:
+                artifacts.append(ast.render_dot(dot_path, 'png'))
+        if 'code' in emit:
+            with open(output, 'w', encoding='utf-8') as output_file:
+                instructions = write_code(tree, output_file, opt_level, range_checks)
+            artifacts.append(output)
+            if cache is not None:
+                cache.put(key, code_file=output)
+            if 'bin' in emit:
+                artifacts.append(_write_binary(output, output_path(name, output_dir, '.ewvb')))
+    except Exception as error:
+        return CompileResult(source, None, time.perf_counter() - start, error=f"{type(error).__name__}: {error}")
+    return CompileResult(source, output if 'code' in emit else None, time.perf_counter() - start, instructions,
+                         artifacts=artifacts)
+
+
+def compile_batch(paths, output_dir, jobs=None, opt_level=0, emit=('code',), use_cache=True, range_checks=False):
+    """Compila todos os ficheiros/diretórios em `paths` para `output_dir`.
+
+    Levanta ValueError, antes de escrever qualquer ficheiro, se duas fontes
+    tivessem o mesmo nome de saída (ex.: `prog.pas` em dois diretórios dados).
+    """
+    sources = collect_sources(paths)
+    check_output_names(sources)
+    os.makedirs(output_dir, exist_ok=True)
+    if jobs == 1 or len(sources) <= 1:
+        return [compile_file(source, output_dir, opt_level, emit, use_cache, range_checks, name)
+                for source, name in sources]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(compile_file, source, output_dir, opt_level, emit, use_cache, range_checks, name)
+                   for source, name in sources]
+        return [future.result() for future in futures]
+
+
+def print_summary(results, wall_time=None):
+    width = max((len(r.source) for r in results), default=6)
+    print(f"{'source':<{width}} {'time(ms)':>9} {'instrs':>7}  status")
+    for r in sorted(results, key=lambda r: r.elapsed, reverse=True):
+        status = r.error if r.error else f"-> {', '.join(r.artifacts)}" + (" (cached)" if r.cached else "")
+        instructions = '-' if r.cached or r.output is None else r.instructions
+        print(f"{r.source:<{width}} {r.elapsed * 1000:>9.2f} {instructions:>7}  {status}")
+    failed = sum(1 for r in results if r.error)
+    cached = sum(1 for r in results if r.cached)
+    total = sum(r.elapsed for r in results)
+    summary = f"\n{len(results)} file(s), {failed} failed, {cached} from cache, {total:.3f}s of compile time"
+    if wall_time is not None:
+        summary += f" in {wall_time:.3f}s wall time"
+    print(summary)
@@ -0,0 +1,49 @@
+"""Benchmark de memória da AST: bytes retidos por nó (tracemalloc) para programas grandes.
+
+Uso: python benchmarks/bench_ast_memory.py [n_statements ...]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ast_nodes as ast
+from lex_pas import lexer
+from yacc_pas import parser
+from program_gen import generate_program
+
+
+def count_nodes(tree):
+    return sum(1 for _ in ast.iter_nodes(tree))
+
+
+def parse_measured(source):
+    """Analisa `source` e devolve (AST, bytes retidos pela AST, tempo de parse)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    lexer.lineno = 1
+    start = time.perf_counter()
+    tree = parser.parse(source, lexer=lexer)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return tree, retained, elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100000, 1000000]
+    print(f"{'statements':>10} {'nodes':>9} {'MB':>8} {'bytes/node':>11} {'parse(s)':>9}")
+    for size in sizes:
+        source = generate_program(size)
+        tree, total, elapsed = parse_measured(source)
+        nodes = count_nodes(tree)
+        print(f"{size:>10} {nodes:>9} {total / 1e6:>8.1f} {total / nodes:>11.1f} {elapsed:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
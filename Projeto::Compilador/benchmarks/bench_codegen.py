@@ -0,0 +1,102 @@
+"""Benchmark da geração de código: despacho por dicionário vs cadeia de isinstance.
+
+Mede só a emissão das instruções; a análise semântica fica fora da medição.
+
+Uso: python benchmarks/bench_codegen.py [n_statements ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ast_nodes as ast
+from lex_pas import lexer
+from yacc_pas import parser
+from pascal_codegen import CodeGenerator
+from program_gen import generate_program
+
+
+class LadderCodeGenerator(CodeGenerator):
+    """Reproduz o despacho antigo (cadeia de isinstance) para comparação."""
+
+    def generate(self, node):
+        if isinstance(node, ast.Program):
+            self.generate_program(node)
+        elif isinstance(node, ast.Block):
+            self.generate_block(node)
+        elif isinstance(node, ast.VarDeclarations):
+            self.generate_var_declarations(node)
+        elif isinstance(node, ast.VarDeclaration):
+            self.generate_var_declaration(node)
+        elif isinstance(node, ast.Compound):
+            self.generate_compound(node)
+        elif isinstance(node, ast.Assignment):
+            self.generate_assignment(node)
+        elif isinstance(node, ast.Variable):
+            self.generate_variable(node)
+        elif isinstance(node, ast.ArrayAccess):
+            self.generate_array_access(node)
+        elif isinstance(node, ast.ProcedureCall):
+            self.generate_procedure_call(node)
+        elif isinstance(node, ast.FunctionCall):
+            self.generate_function_call(node)
+        elif isinstance(node, ast.IfStatement):
+            self.generate_if_statement(node)
+        elif isinstance(node, ast.WhileStatement):
+            self.generate_while_statement(node)
+        elif isinstance(node, ast.ForStatement):
+            self.generate_for_statement(node)
+        elif isinstance(node, ast.BinaryOp):
+            self.generate_binary_op(node)
+        elif isinstance(node, ast.UnaryOp):
+            self.generate_unary_op(node)
+        elif isinstance(node, ast.Number):
+            self.generate_number(node)
+        elif isinstance(node, ast.String):
+            self.generate_string(node)
+        elif isinstance(node, ast.Boolean):
+            self.generate_boolean(node)
+        elif isinstance(node, ast.CharLiteral):
+            self.generate_char_literal(node)
+        elif isinstance(node, ast.NoOp):
+            pass
+        elif isinstance(node, ast.ReadlnAssignment):
+            self.generate_readln_assignment(node)
+        elif isinstance(node, list):
+            for item in node:
+                self.generate(item)
+        else:
+            raise ValueError(f"Unknown node type: {type(node)}")
+        return self.code
+
+
+def time_codegen(generator_class, tree, repeat=3):
+    """Melhor tempo a gerar o código do bloco de `tree`: só o despacho e os handlers.
+
+    A análise semântica (tipos e pool de literais) é igual nos dois geradores e
+    é feita antes da medição, para não diluir a diferença entre os despachos.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        generator = generator_class()
+        generator.analyze(tree)
+        start = time.perf_counter()
+        generator.generate(tree.block)
+        best = min(best, time.perf_counter() - start)
+    return best, len(generator.code)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    print(f"{'statements':>10} {'instrs':>9} {'isinstance(s)':>14} {'dispatch(s)':>12} {'speedup':>8}")
+    for size in sizes:
+        lexer.lineno = 1
+        tree = parser.parse(generate_program(size), lexer=lexer)
+        ladder, n_instrs = time_codegen(LadderCodeGenerator, tree)
+        dispatch, _ = time_codegen(CodeGenerator, tree)
+        print(f"{size:>10} {n_instrs:>9} {ladder:>14.4f} {dispatch:>12.4f} {ladder / dispatch:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Benchmark do analisador léxico em tokens por segundo.
+
+Uso: python benchmarks/bench_lexer.py [n_statements ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lex_pas import lexer
+from program_gen import generate_program
+
+
+def time_lexer(source, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        lexer.lineno = 1
+        lexer.input(source)
+        token = lexer.token
+        count = 0
+        start = time.perf_counter()
+        while token():
+            count += 1
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20000, 100000]
+    print(f"{'statements':>10} {'MB':>7} {'tokens':>9} {'time(s)':>9} {'tokens/s':>11}")
+    for size in sizes:
+        source = generate_program(size)
+        elapsed, count = time_lexer(source)
+        megabytes = len(source.encode('utf-8')) / 1e6
+        print(f"{size:>10} {megabytes:>7.2f} {count:>9} {elapsed:>9.3f} {count / elapsed:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Benchmark do parser: tempo de análise em função do número de instruções.
+
+Uso: python benchmarks/bench_parse.py [n_statements ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lex_pas import lexer
+from yacc_pas import parser
+from program_gen import generate_program
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000, 1000000]
+    print(f"{'statements':>10} {'parse(s)':>9} {'us/statement':>13}")
+    for size in sizes:
+        source = generate_program(size)
+        lexer.lineno = 1
+        start = time.perf_counter()
+        parser.parse(source, lexer=lexer)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>10} {elapsed:>9.3f} {elapsed / size * 1e6:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
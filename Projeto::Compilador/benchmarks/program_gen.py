@@ -0,0 +1,148 @@
+"""Geração de programas Pascal sintéticos para os benchmarks do compilador.
+
+Os programas seguem a gramática de `grammar.bnf` e compilam com o
+CodeGenerator. O tamanho é controlado em várias dimensões independentes:
+
+- statements: número de instruções no corpo do programa
+- expr_depth: profundidade das expressões aritméticas
+- if_depth: aninhamento de if/else em cada instrução condicional
+- loop_depth: aninhamento de ciclos for/while em cada instrução de ciclo
+- arrays: número de arrays declarados e usados
+- string_volume: comprimento dos literais string escritos com writeln (0 = nenhum)
+
+Uso: python benchmarks/program_gen.py [--statements N] [--expr-depth D] ... > prog.pas
+"""
+import random
+
+DEFAULTS = {
+    'statements': 1000,
+    'expr_depth': 2,
+    'if_depth': 1,
+    'loop_depth': 1,
+    'arrays': 1,
+    'string_volume': 0,
+}
+
+ARRAY_SIZE = 10
+N_VARIABLES = 8
+
+
+class ProgramGenerator:
+    def __init__(self, seed=0, expr_depth=2, if_depth=1, loop_depth=1, arrays=1, string_volume=0):
+        self.rng = random.Random(seed)
+        self.expr_depth = max(1, expr_depth)
+        self.if_depth = if_depth
+        self.loop_depth = loop_depth
+        self.arrays = [f"a{i}" for i in range(arrays)]
+        self.string_volume = string_volume
+        self.variables = [f"v{i}" for i in range(N_VARIABLES)]
+        self.loop_vars = [f"i{i}" for i in range(max(1, loop_depth))]
+
+    def variable(self):
+        return self.rng.choice(self.variables)
+
+    def operand(self):
+        roll = self.rng.random()
+        if roll < 0.5:
+            return self.variable()
+        if roll < 0.75 or not self.arrays:
+            return str(self.rng.randint(0, 99))
+        return f"{self.rng.choice(self.arrays)}[{self.rng.randint(1, ARRAY_SIZE)}]"
+
+    def expression(self, depth=None):
+        """Expressão inteira com `depth` operadores aninhados."""
+        depth = self.expr_depth if depth is None else depth
+        if depth <= 1:
+            op = self.rng.choice(['+', '-', '*'])
+            return f"{self.operand()} {op} {self.operand()}"
+        op = self.rng.choice(['+', '-', '*', 'div', 'mod'])
+        inner = self.expression(depth - 1)
+        if op in ('div', 'mod'):
+            return f"({inner}) {op} {self.rng.randint(1, 9)}"
+        if self.rng.random() < 0.5:
+            return f"({inner}) {op} {self.operand()}"
+        return f"{self.operand()} {op} ({inner})"
+
+    def condition(self):
+        op = self.rng.choice(['<', '<=', '>', '>=', '=', '<>'])
+        return f"{self.variable()} {op} {self.operand()}"
+
+    def assignment(self):
+        if self.arrays and self.rng.random() < 0.3:
+            target = f"{self.rng.choice(self.arrays)}[{self.rng.randint(1, ARRAY_SIZE)}]"
+        else:
+            target = self.variable()
+        # mod mantém os valores limitados quando o programa é executado (ewvm.py)
+        return f"{target} := ({self.expression()}) mod 1000"
+
+    def if_statement(self, depth):
+        if depth <= 0:
+            return self.assignment()
+        return (f"if {self.condition()} then begin {self.if_statement(depth - 1)} end "
+                f"else begin {self.assignment()} end")
+
+    def loop_statement(self, depth, level=0):
+        if depth <= 0:
+            return self.assignment()
+        body = self.loop_statement(depth - 1, level + 1)
+        # Cada nível tem a sua variável de controlo, que mais nada altera: os ciclos terminam
+        loop_var = self.loop_vars[level]
+        count = self.rng.randint(2, 5)
+        if level % 2 == 0:
+            return f"for {loop_var} := 1 to {count} do begin {body} end"
+        return (f"begin {loop_var} := {count}; "
+                f"while {loop_var} > 0 do begin {loop_var} := {loop_var} - 1; {body} end end")
+
+    def write_statement(self):
+        if self.string_volume:
+            text = ''.join(self.rng.choice('abcdefghij klmnop') for _ in range(self.string_volume))
+            return f"writeln('{text}', {self.variable()})"
+        return f"writeln({self.variable()})"
+
+    def statement(self, index):
+        kinds = ['assign', 'assign']
+        if self.if_depth > 0:
+            kinds.append('if')
+        if self.loop_depth > 0:
+            kinds.append('loop')
+        if self.string_volume:
+            kinds.append('write')
+        kind = kinds[index % len(kinds)]
+        if kind == 'if':
+            return self.if_statement(self.if_depth)
+        if kind == 'loop':
+            return self.loop_statement(self.loop_depth)
+        if kind == 'write':
+            return self.write_statement()
+        return self.assignment()
+
+    def program(self, statements):
+        lines = ["program Bench;", f"var {', '.join(self.variables + self.loop_vars)}: integer;"]
+        for name in self.arrays:
+            lines.append(f"    {name}: array[1..{ARRAY_SIZE}] of integer;")
+        lines.append("begin")
+        for name in self.variables:
+            lines.append(f"  {name} := {self.rng.randint(0, 9)};")
+        for index in range(statements):
+            lines.append(f"  {self.statement(index)};")
+        lines.append("  writeln(v0)")
+        lines.append("end.")
+        return "\n".join(lines) + "\n"
+
+
+def generate_program(statements, seed=0, **dimensions):
+    """Gera um programa válido com `statements` instruções (ver DEFAULTS)."""
+    options = {key: value for key, value in DEFAULTS.items() if key != 'statements'}
+    options.update(dimensions)
+    return ProgramGenerator(seed=seed, **options).program(statements)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Gera um programa Pascal sintético.")
+    for name, default in DEFAULTS.items():
+        arg_parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = vars(arg_parser.parse_args())
+    print(generate_program(args.pop('statements'), **args), end='')
@@ -0,0 +1,165 @@
+"""Suite de benchmarks do compilador por dimensão dos programas gerados.
+
+Para cada dimensão de `program_gen` (nº de instruções, profundidade das
+expressões, aninhamento de if/ciclos, nº de arrays, volume de strings) varia
+essa dimensão mantendo as outras fixas e mede o débito do lexer (tokens/s),
+do parser e do CodeGenerator (nós/s) e o pico de memória de parse+codegen.
+
+    python benchmarks/run_benchmarks.py --save          # grava a baseline
+    python benchmarks/run_benchmarks.py                 # compara com a baseline
+
+Sai com código 1 quando alguma medição piora mais do que --tolerance em
+relação à baseline (débito mais baixo ou memória mais alta).
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from lex_pas import lexer
+from yacc_pas import parser
+from pascal_codegen import CodeGenerator
+from profiling import _TokenReplay, count_nodes_by_class
+from program_gen import generate_program
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# dimensão -> (valores, nº de instruções usado quando a dimensão não é 'statements')
+DIMENSIONS = {
+    'statements': ([1000, 5000, 20000], None),
+    'expr_depth': ([1, 4, 16], 2000),
+    'if_depth': ([0, 4, 12], 2000),
+    'loop_depth': ([0, 3, 8], 2000),
+    'arrays': ([0, 10, 100], 2000),
+    'string_volume': ([0, 64, 1024], 2000),
+}
+
+# Métricas em que valores maiores são melhores (as restantes: menores são melhores)
+HIGHER_IS_BETTER = {'lex_tokens_per_s', 'parse_nodes_per_s', 'codegen_nodes_per_s'}
+
+
+def _best_time(function, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _tokenize(source):
+    lexer.lineno = 1
+    lexer.input(source)
+    return list(iter(lexer.token, None))
+
+
+def _codegen(tree):
+    generator = CodeGenerator()
+    generator.generate(tree)
+    return generator.code
+
+
+def measure(source, repeat=3):
+    lex_time, tokens = _best_time(lambda: _tokenize(source), repeat)
+    parse_time, tree = _best_time(lambda: parser.parse(lexer=_TokenReplay(tokens, source)), repeat)
+    nodes = sum(count_nodes_by_class(tree).values())
+    codegen_time, code = _best_time(lambda: _codegen(tree), repeat)
+
+    tracemalloc.start()
+    parsed = parser.parse(lexer=_TokenReplay(tokens, source))
+    _codegen(parsed)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'tokens': len(tokens),
+        'nodes': nodes,
+        'instructions': len(code),
+        'lex_tokens_per_s': len(tokens) / lex_time,
+        'parse_nodes_per_s': nodes / parse_time,
+        'codegen_nodes_per_s': nodes / codegen_time,
+        'peak_bytes_per_node': peak / nodes,
+    }
+
+
+def run_suite(quick=False, repeat=3):
+    results = {}
+    for dimension, (values, statements) in DIMENSIONS.items():
+        for value in values:
+            if dimension == 'statements':
+                size = value // 10 if quick else value
+                source = generate_program(size)
+            else:
+                size = statements // 10 if quick else statements
+                source = generate_program(size, **{dimension: value})
+            key = f"{dimension}={value}"
+            results[key] = measure(source, repeat)
+            r = results[key]
+            print(f"{key:<20} {r['tokens']:>8} tok {r['lex_tokens_per_s']:>10.0f} tok/s "
+                  f"{r['parse_nodes_per_s']:>9.0f} parse nodes/s {r['codegen_nodes_per_s']:>9.0f} codegen nodes/s "
+                  f"{r['peak_bytes_per_node']:>7.1f} B/node")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Devolve a lista de regressões (texto) em relação à baseline."""
+    regressions = []
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric, value in metrics.items():
+            if metric not in base or metric in ('tokens', 'nodes', 'instructions'):
+                continue
+            reference = base[metric]
+            if metric in HIGHER_IS_BETTER:
+                worse = value < reference * (1 - tolerance)
+            else:
+                worse = value > reference * (1 + tolerance)
+            if worse:
+                change = (value - reference) / reference * 100
+                regressions.append(f"{key} {metric}: {reference:.1f} -> {value:.1f} ({change:+.1f}%)")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmarks do compilador com deteção de regressões.")
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="ficheiro JSON da baseline")
+    arg_parser.add_argument('--save', action='store_true', help="grava os resultados como nova baseline")
+    arg_parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="piora relativa tolerada antes de assinalar regressão (por omissão 0.2)")
+    arg_parser.add_argument('--quick', action='store_true', help="programas 10x mais pequenos")
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    results = run_suite(args.quick, args.repeat)
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
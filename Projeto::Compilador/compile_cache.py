@@ -0,0 +1,141 @@
+"""Cache de compilação endereçada pelo conteúdo.
+
+A chave é um hash do texto fonte, do nível de otimização e da versão do
+compilador (o conteúdo dos módulos da gramática, do lexer e da geração de
+código), por isso qualquer alteração ao compilador invalida as entradas
+antigas. Cada entrada guarda o código EWVM (`<chave>.ewvm`) e, opcionalmente,
+a AST formatada por `pretty_print_ast` (`<chave>.ast`).
+
+Os ficheiros são escritos com um nome temporário e renomeados, o que torna a
+cache segura com vários processos a escrever ao mesmo tempo. Quando o tamanho
+total passa do limite, as entradas menos usadas recentemente (mtime, atualizado
+em cada acerto) são removidas.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from ply_cache import CACHE_DIR
+
+DEFAULT_DIR = os.environ.get('PASCAL_COMPILE_CACHE_DIR', os.path.join(CACHE_DIR, 'compile'))
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+COMPILER_MODULES = (
+    'lex_pas.py', 'yacc_pas.py', 'ast_nodes.py', 'pascal_codegen.py',
+    'constant_folding.py', 'peephole.py', 'semantic.py',
+    'loop_invariants.py', 'cse.py',
+)
+
+_compiler_version = None
+
+
+def compiler_version():
+    """Hash do código fonte dos módulos que determinam o código gerado."""
+    global _compiler_version
+    if _compiler_version is None:
+        sha = hashlib.sha256()
+        base = os.path.dirname(os.path.abspath(__file__))
+        for name in COMPILER_MODULES:
+            with open(os.path.join(base, name), 'rb') as module_file:
+                sha.update(module_file.read())
+        _compiler_version = sha.hexdigest()
+    return _compiler_version
+
+
+class CacheEntry:
+    def __init__(self, code, ast_text=None):
+        self.code = code
+        self.ast_text = ast_text
+
+
+class CompileCache:
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, opt_level=0, range_checks=False):
+        sha = hashlib.sha256()
+        sha.update(compiler_version().encode())
+        sha.update(f"|O{opt_level}|".encode())
+        if range_checks:
+            sha.update(b"range-checks|")
+        sha.update(source.encode('utf-8'))
+        return sha.hexdigest()
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key + extension)
+
+    def get(self, key, need_ast=False):
+        """Devolve a CacheEntry de `key`, ou None se não existir (ou faltar a AST).
+
+        O código é lido aqui: outro processo pode remover a entrada logo a seguir.
+        """
+        code_path = self._path(key, '.ewvm')
+        ast_text = None
+        try:
+            if need_ast:
+                with open(self._path(key, '.ast'), 'r', encoding='utf-8') as ast_file:
+                    ast_text = ast_file.read()
+            with open(code_path, 'r', encoding='utf-8') as code_file:
+                code = code_file.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(code_path)
+        except FileNotFoundError:
+            pass
+        return CacheEntry(code, ast_text)
+
+    def _write_atomic(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                write(tmp_file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def put(self, key, code=None, code_file=None, ast_text=None):
+        """Guarda o código (texto `code` ou cópia do ficheiro `code_file`)."""
+        if ast_text is not None:
+            self._write_atomic(self._path(key, '.ast'), lambda f: f.write(ast_text))
+        if code_file is not None:
+            with open(code_file, 'r', encoding='utf-8') as source_file:
+                self._write_atomic(self._path(key, '.ewvm'), lambda f: shutil.copyfileobj(source_file, f))
+        else:
+            self._write_atomic(self._path(key, '.ewvm'), lambda f: f.write(code))
+        self.evict()
+
+    def evict(self):
+        """Remove as entradas menos usadas até o total caber em `max_bytes`."""
+        entries = {}
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if item.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                key = os.path.splitext(item.name)[0]
+                size, mtime = entries.get(key, (0, 0))
+                entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            for extension in ('.ewvm', '.ast'):
+                try:
+                    os.unlink(self._path(key, extension))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            if total <= self.max_bytes:
+                break
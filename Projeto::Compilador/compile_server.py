@@ -0,0 +1,109 @@
+"""Servidor de compilação com o lexer e o parser sempre carregados.
+
+Cada pedido é uma linha JSON e cada resposta também:
+
+    {"id": 1, "source": "program P; begin end.", "opt_level": 1, "range_checks": false, "ast": false}
+    {"id": 1, "ok": true, "code": "start\\nstop", "diagnostics": [], "elapsed_ms": 0.4}
+
+Em caso de erro `ok` é false, `code` é null e `diagnostics` tem as mensagens
+(incluindo os erros de sintaxe que o parser escreveria no stdout). Uma exceção
+inesperada do compilador (ex.: RecursionError num programa muito aninhado) não
+termina o servidor: a resposta tem `ok` false e a exceção em `error`.
+
+Uso: python compile_server.py                 (JSON lines em stdin/stdout)
+     python compile_server.py --socket PATH   (socket Unix local)
+"""
+import contextlib
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+
+import ast_nodes as ast
+from yacc_pas import parse_source, generate_code
+
+# O lexer e o parser do PLY são globais: os pedidos são compilados um de cada vez
+_compile_lock = threading.Lock()
+
+
+def handle_request(request):
+    """Compila um pedido (dict) e devolve a resposta (dict)."""
+    response = {'id': request.get('id'), 'ok': False, 'code': None, 'diagnostics': []}
+    source = request.get('source')
+    if not isinstance(source, str):
+        response['diagnostics'].append("Invalid request: 'source' must be a string")
+        return response
+    opt_level = request.get('opt_level', 0)
+
+    started = time.perf_counter()
+    messages = io.StringIO()
+    with _compile_lock:
+        try:
+            with contextlib.redirect_stdout(messages):
+                tree = parse_source(source, opt_level)
+                if request.get('ast'):
+                    response['ast'] = ast.format_ast(tree)
+                # Um CodeGenerator novo por pedido: nenhum estado passa entre compilações
+                response['code'] = generate_code(tree, opt_level, bool(request.get('range_checks')))
+            response['ok'] = True
+        except (SyntaxError, TypeError, ValueError, KeyError) as error:
+            response['diagnostics'].append(f"{type(error).__name__}: {error}")
+        except Exception as error:
+            response['error'] = f"{type(error).__name__}: {error}"
+    response['diagnostics'][:0] = [line for line in messages.getvalue().splitlines() if line]
+    response['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return response
+
+
+def handle_line(line):
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+    except ValueError as error:
+        return {'id': None, 'ok': False, 'code': None, 'diagnostics': [f"Invalid request: {error}"]}
+    return handle_request(request)
+
+
+def serve_stream(infile, outfile):
+    """Atende pedidos JSON lines de `infile` até EOF, escrevendo em `outfile`."""
+    for line in infile:
+        if not line.strip():
+            continue
+        outfile.write(json.dumps(handle_line(line)) + '\n')
+        outfile.flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        reader = io.TextIOWrapper(self.rfile, encoding='utf-8')
+        writer = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+        serve_stream(reader, writer)
+
+
+def serve_unix_socket(path):
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, _RequestHandler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Servidor de compilação Pascal -> EWVM (JSON lines).")
+    arg_parser.add_argument('--socket', help="caminho do socket Unix (por omissão usa stdin/stdout)")
+    args = arg_parser.parse_args()
+    try:
+        if args.socket:
+            serve_unix_socket(args.socket)
+        else:
+            serve_stream(sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
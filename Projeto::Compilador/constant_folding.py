@@ -0,0 +1,291 @@
+"""Dobragem de constantes e simplificação algébrica sobre a AST.
+
+Corre entre `parser.parse` e `CodeGenerator.generate`. As regras seguem a
+semântica do código que o CodeGenerator emite: inteiros e reais não se
+misturam silenciosamente, `div`/`mod` truncam para zero como em Pascal e
+nada é dobrado quando o resultado dependeria de uma divisão por zero.
+
+Os `if` com condição constante são substituídos pelo ramo escolhido e os
+`while false` desaparecem.
+"""
+import ast_nodes as ast
+from semantic import FUNCTION_TYPES, SAME_TYPE_FUNCTIONS
+
+RELATIONAL_OPS = {
+    '=': lambda a, b: a == b,
+    '<>': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+def _pascal_div(a, b):
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+
+def _pascal_mod(a, b):
+    return a - b * _pascal_div(a, b)
+
+
+def _is_number(node, value=None):
+    if not isinstance(node, ast.Number) or isinstance(node.value, bool):
+        return False
+    return value is None or node.value == value
+
+
+def _is_integer_literal(node, value):
+    return _is_number(node, value) and isinstance(node.value, int)
+
+
+def _is_pure(node):
+    # As funções predefinidas não têm efeitos (chr emite a instrução chr); uma
+    # expressão só não pode ser descartada se a sua avaliação puder falhar: divisão
+    # por um valor que não é uma constante diferente de zero ou acesso a um array
+    # (com -C o índice é verificado)
+    if isinstance(node, ast.FunctionCall):
+        return all(_is_pure(arg) for arg in node.args)
+    if isinstance(node, ast.BinaryOp):
+        if node.op in ('/', 'div', 'mod') and not (_is_number(node.right) and node.right.value != 0):
+            return False
+        return _is_pure(node.left) and _is_pure(node.right)
+    if isinstance(node, ast.UnaryOp):
+        return _is_pure(node.expr)
+    if isinstance(node, ast.ArrayAccess):
+        return False
+    return True
+
+
+class ConstantFolder:
+    def __init__(self):
+        self.type_info = {}
+
+    def fold(self, node):
+        method = getattr(self, f"fold_{type(node).__name__}", None)
+        if method is None:
+            return node
+        result = method(node)
+        # O literal (ou NoOp) que substitui o nó fica com a posição dele no fonte
+        if result is not node and isinstance(result, ast.Node) and result.lineno is None:
+            ast.copy_position(result, node)
+        return result
+
+    def fold_list(self, node):
+        return [self.fold(item) for item in node]
+
+    def fold_Program(self, node):
+        node.block = self.fold(node.block)
+        return node
+
+    def fold_Block(self, node):
+        node.declarations = self.fold(node.declarations)
+        node.compound_statement = self.fold(node.compound_statement)
+        return node
+
+    def fold_VarDeclarations(self, node):
+        node.declarations = self.fold(node.declarations)
+        return node
+
+    def fold_VarDeclaration(self, node):
+        if isinstance(node.type, ast.ArrayType):
+            node.type.index_range.lower = self.fold(node.type.index_range.lower)
+            node.type.index_range.upper = self.fold(node.type.index_range.upper)
+            element_type = node.type.element_type
+            var_type = 'array:' + (element_type.name if isinstance(element_type, ast.Type) else str(element_type)).lower()
+        else:
+            var_type = (node.type.name if isinstance(node.type, ast.Type) else str(node.type)).lower()
+        for name in node.names:
+            self.type_info[name] = var_type
+        return node
+
+    def fold_Compound(self, node):
+        node.statements = [stmt for stmt in self.fold(node.statements) if not isinstance(stmt, ast.NoOp)]
+        return node
+
+    def fold_Assignment(self, node):
+        if isinstance(node.left, ast.ArrayAccess):
+            node.left.index = self.fold(node.left.index)
+        node.right = self.fold(node.right)
+        return node
+
+    def fold_ArrayAccess(self, node):
+        node.index = self.fold(node.index)
+        return node
+
+    def fold_ProcedureCall(self, node):
+        node.args = self.fold(node.args)
+        return node
+
+    def fold_FunctionCall(self, node):
+        node.args = self.fold(node.args)
+        return node
+
+    def fold_ReadlnAssignment(self, node):
+        if isinstance(node.target, ast.ArrayAccess):
+            node.target.index = self.fold(node.target.index)
+        return node
+
+    def fold_IfStatement(self, node):
+        node.condition = self.fold(node.condition)
+        node.then_part = self.fold(node.then_part)
+        if node.else_part:
+            node.else_part = self.fold(node.else_part)
+        if isinstance(node.condition, ast.Boolean):
+            branch = node.then_part if node.condition.value else node.else_part
+            return branch if branch else ast.NoOp()
+        return node
+
+    def fold_WhileStatement(self, node):
+        node.condition = self.fold(node.condition)
+        if isinstance(node.condition, ast.Boolean) and not node.condition.value:
+            return ast.NoOp()
+        node.body = self.fold(node.body)
+        return node
+
+    def fold_ForStatement(self, node):
+        node.start_value = self.fold(node.start_value)
+        node.end_value = self.fold(node.end_value)
+        node.body = self.fold(node.body)
+        return node
+
+    def fold_UnaryOp(self, node):
+        node.expr = self.fold(node.expr)
+        expr = node.expr
+        if node.op == '+' and _is_number(expr):
+            return expr
+        if node.op == '-' and _is_number(expr):
+            return ast.Number(-expr.value)
+        if node.op == 'not':
+            if isinstance(expr, ast.Boolean):
+                return ast.Boolean(not expr.value)
+            # not not x só é x quando x já é um booleano (0/1)
+            if isinstance(expr, ast.UnaryOp) and expr.op == 'not' and self.expression_type(expr.expr) == 'boolean':
+                return expr.expr
+        return node
+
+    def fold_BinaryOp(self, node):
+        node.left = self.fold(node.left)
+        node.right = self.fold(node.right)
+        left, right, op = node.left, node.right, node.op
+
+        if _is_number(left) and _is_number(right):
+            folded = self._fold_numbers(op, left.value, right.value)
+            if folded is not None:
+                return folded
+        elif isinstance(left, ast.Boolean) and isinstance(right, ast.Boolean):
+            if op == 'and':
+                return ast.Boolean(left.value and right.value)
+            if op == 'or':
+                return ast.Boolean(left.value or right.value)
+            if op in ('=', '<>'):
+                return ast.Boolean(RELATIONAL_OPS[op](left.value, right.value))
+        return self._simplify_identity(node)
+
+    def _fold_numbers(self, op, a, b):
+        is_real = isinstance(a, float) or isinstance(b, float)
+        if op in RELATIONAL_OPS:
+            return ast.Boolean(RELATIONAL_OPS[op](a, b))
+        if op == '+':
+            return ast.Number(a + b)
+        if op == '-':
+            return ast.Number(a - b)
+        if op == '*':
+            return ast.Number(a * b)
+        if op == '/' and is_real and b != 0:
+            return ast.Number(a / b)
+        if op == 'div' and not is_real and b != 0:
+            return ast.Number(_pascal_div(a, b))
+        if op == 'mod' and not is_real and b != 0:
+            return ast.Number(_pascal_mod(a, b))
+        return None
+
+    def _simplify_identity(self, node):
+        left, right, op = node.left, node.right, node.op
+        if op == '+':
+            if _is_integer_literal(right, 0) and self._is_numeric(left):
+                return left
+            if _is_integer_literal(left, 0) and self._is_numeric(right):
+                return right
+        elif op == '-':
+            if _is_integer_literal(right, 0) and self._is_numeric(left):
+                return left
+        elif op == '*':
+            if _is_integer_literal(right, 1) and self._is_numeric(left):
+                return left
+            if _is_integer_literal(left, 1) and self._is_numeric(right):
+                return right
+            for operand, literal in ((left, right), (right, left)):
+                if _is_integer_literal(literal, 0) and self._is_numeric(operand) and _is_pure(operand):
+                    return ast.Number(0.0 if self.expression_type(operand) == 'real' else 0)
+        elif op == 'div':
+            if _is_integer_literal(right, 1) and self.expression_type(left) == 'integer':
+                return left
+        elif op == 'and':
+            if isinstance(right, ast.Boolean) and right.value and self.expression_type(left) == 'boolean':
+                return left
+            if isinstance(left, ast.Boolean) and left.value and self.expression_type(right) == 'boolean':
+                return right
+        elif op == 'or':
+            if isinstance(right, ast.Boolean) and not right.value and self.expression_type(left) == 'boolean':
+                return left
+            if isinstance(left, ast.Boolean) and not left.value and self.expression_type(right) == 'boolean':
+                return right
+        return node
+
+    def _is_numeric(self, node):
+        return self.expression_type(node) in ('integer', 'real')
+
+    def expression_type(self, node):
+        """Tipo estático de uma expressão, ou None se não for conhecido."""
+        if isinstance(node, ast.Boolean):
+            return 'boolean'
+        if isinstance(node, ast.Number):
+            return 'real' if isinstance(node.value, float) else 'integer'
+        if isinstance(node, ast.Variable):
+            var_type = self.type_info.get(node.name)
+            return None if var_type is None or var_type.startswith('array:') else var_type
+        if isinstance(node, ast.ArrayAccess):
+            var_type = self.type_info.get(node.array.name)
+            if var_type == 'string':
+                return 'char'
+            if var_type and var_type.startswith('array:'):
+                return var_type[len('array:'):]
+            return None
+        if isinstance(node, ast.UnaryOp):
+            expr_type = self.expression_type(node.expr)
+            if node.op == 'not':
+                return 'boolean' if expr_type == 'boolean' else None
+            return expr_type
+        if isinstance(node, ast.BinaryOp):
+            if node.op in RELATIONAL_OPS:
+                return 'boolean'
+            left_type = self.expression_type(node.left)
+            right_type = self.expression_type(node.right)
+            if node.op in ('and', 'or'):
+                return 'boolean' if left_type == right_type == 'boolean' else None
+            if left_type not in ('integer', 'real') or right_type not in ('integer', 'real'):
+                return None
+            if node.op in ('div', 'mod'):
+                return 'integer'
+            return 'real' if 'real' in (left_type, right_type) else 'integer'
+        if isinstance(node, ast.FunctionCall):
+            name = node.name.lower()
+            if name in SAME_TYPE_FUNCTIONS:
+                return self.expression_type(node.args[0]) if node.args else None
+            return FUNCTION_TYPES.get(name)
+        return None
+
+
+def fold_constants(tree):
+    """Devolve a AST com as expressões constantes dobradas."""
+    return ConstantFolder().fold(tree)
+
+
+def constant_value(node):
+    """Avalia uma expressão constante (ex.: limite de um IndexRange)."""
+    folded = ConstantFolder().fold(node)
+    if isinstance(folded, (ast.Number, ast.Boolean)):
+        return folded.value
+    raise ValueError(f"Expression is not a compile-time constant: {node}")
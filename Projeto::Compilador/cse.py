@@ -0,0 +1,291 @@
+"""Eliminação de subexpressões comuns dentro de cada bloco básico (-O1).
+
+Um bloco básico é uma sequência de atribuições, chamadas de escrita e
+leituras sem `if`/`while`/`for` pelo meio. Dentro de um bloco, cada
+expressão pura (operadores aritméticos, relacionais e lógicos e funções sem
+efeitos, sobre variáveis e literais) recebe um número: duas expressões têm o
+mesmo número quando têm a mesma estrutura e leem as mesmas versões das
+variáveis — cada atribuição a uma variável cria uma versão nova, o que
+invalida as expressões que a leem.
+
+Quando uma expressão se repete e compensa (`(n - 1) * (custo - 1) > 2`, com
+`n` ocorrências), é calculada uma vez para uma variável auxiliar (`$cse0`,
+...) antes da instrução onde aparece primeiro, e as ocorrências passam a ler
+essa variável. Os índices dos arrays (`a[i+1] := a[i+1] + b[i+1]`) são o caso
+mais comum. As variáveis auxiliares são reutilizadas de bloco para bloco.
+
+Tal como em `loop_invariants`, só entram expressões que não podem falhar.
+"""
+import ast_nodes as ast
+from loop_invariants import HOISTABLE_TYPES, SAFE_OPS, SAFE_FUNCTIONS
+from semantic import SemanticAnalyzer
+
+SIMPLE_STATEMENTS = (ast.Assignment, ast.ProcedureCall, ast.ReadlnAssignment, ast.NoOp)
+
+
+def expression_key(node, ids, versions=None):
+    """Número da expressão pura `node` (igual para expressões equivalentes) e o seu custo.
+
+    O número é None se `node` não for pura e segura. `ids` é o dicionário de
+    hash-consing partilhado entre chamadas; `versions` dá a versão atual de
+    cada variável (por omissão todas na versão 0).
+    """
+    keys = {}
+    _key_all(node, ids, versions or {}, keys)
+    return keys[node]
+
+
+class _Group:
+    __slots__ = ('first', 'statement', 'count', 'cost')
+
+    def __init__(self, first, statement, cost):
+        self.first = first
+        self.statement = statement
+        self.count = 1
+        self.cost = cost
+
+
+class CommonSubexpressionEliminator:
+    def __init__(self, types):
+        self.types = types
+        self.temporaries = []
+
+    def eliminate(self, node):
+        method = getattr(self, f"eliminate_{type(node).__name__}", None)
+        if method is None:
+            return node
+        return method(node)
+
+    def eliminate_Program(self, node):
+        node.block = self.eliminate(node.block)
+        return node
+
+    def eliminate_Block(self, node):
+        node.compound_statement = self.eliminate(node.compound_statement)
+        if self.temporaries:
+            declarations = [ast.VarDeclaration(names=[name], type=var_type)
+                            for name, var_type in self.temporaries]
+            node.declarations = (node.declarations or []) + [ast.VarDeclarations(declarations)]
+        return node
+
+    def eliminate_Compound(self, node):
+        node.statements = self._statements(node.statements)
+        return node
+
+    def eliminate_IfStatement(self, node):
+        node.then_part = self._statement(node.then_part)
+        if node.else_part:
+            node.else_part = self._statement(node.else_part)
+        return node
+
+    def eliminate_WhileStatement(self, node):
+        node.body = self._statement(node.body)
+        return node
+
+    def eliminate_ForStatement(self, node):
+        node.body = self._statement(node.body)
+        return node
+
+    def _statement(self, node):
+        if isinstance(node, SIMPLE_STATEMENTS):
+            statements = self._statements([node])
+            if len(statements) == 1:
+                return statements[0]
+            return ast.copy_position(ast.Compound(statements=statements), node)
+        return self.eliminate(node)
+
+    def _statements(self, statements):
+        result = []
+        block = []
+        for stmt in statements:
+            if isinstance(stmt, SIMPLE_STATEMENTS):
+                block.append(stmt)
+                continue
+            result.extend(self._basic_block(block))
+            block = []
+            result.append(self.eliminate(stmt))
+        result.extend(self._basic_block(block))
+        return result
+
+    def _basic_block(self, block):
+        if len(block) == 0:
+            return block
+        ids = {}
+        versions = {}
+        groups = {}
+        group_of = {}
+        for index, stmt in enumerate(block):
+            for expr in _expressions(stmt):
+                self._collect(expr, index, ids, versions, groups, group_of)
+            for name in _assigned(stmt):
+                versions[name] = versions.get(name, 0) + 1
+
+        chosen = {group_id: group for group_id, group in groups.items()
+                  if (group.count - 1) * (group.cost - 1) > 2
+                  and self.types.get(group.first) in HOISTABLE_TYPES}
+        if not chosen:
+            return block
+
+        # Nomes reutilizados entre blocos: as auxiliares de um bloco morrem no fim dele
+        used = {}
+        temp_of = {}
+        for group_id, group in chosen.items():
+            var_type = self.types[group.first]
+            temp_of[group_id] = self._temporary(var_type, used.get(var_type, 0))
+            used[var_type] = used.get(var_type, 0) + 1
+
+        replacement = {node: temp_of[group_id] for node, group_id in group_of.items() if group_id in chosen}
+        assignments = {}
+        # As mais pequenas primeiro: uma auxiliar pode ser usada no cálculo de outra
+        for group_id, group in sorted(chosen.items(), key=lambda item: item[1].cost):
+            right = _rewrite_children(group.first, replacement)
+            assignments.setdefault(group.statement, []).append(ast.copy_position(
+                ast.Assignment(left=ast.Variable(name=temp_of[group_id]), right=right), group.first))
+
+        result = []
+        for index, stmt in enumerate(block):
+            result.extend(assignments.get(index, ()))
+            _rewrite_statement(stmt, replacement)
+            result.append(stmt)
+        return result
+
+    def _collect(self, expr, index, ids, versions, groups, group_of):
+        """Regista as ocorrências das subexpressões de `expr` (pré-ordem; repetições não são visitadas)."""
+        keys = {}
+        _key_all(expr, ids, versions, keys)
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            key, cost = keys.get(node, (None, 1))
+            if key is not None and isinstance(node, (ast.BinaryOp, ast.UnaryOp, ast.FunctionCall)):
+                group = groups.get(key)
+                group_of[node] = key
+                if group is not None:
+                    group.count += 1
+                    continue
+                groups[key] = _Group(node, index, cost)
+            stack.extend(reversed(_children(node)))
+
+    def _temporary(self, var_type, number):
+        names = [name for name, temp_type in self.temporaries if temp_type == var_type]
+        if number < len(names):
+            return names[number]
+        name = f"$cse{len(self.temporaries)}"
+        self.temporaries.append((name, var_type))
+        return name
+
+
+def _children(node):
+    if isinstance(node, ast.BinaryOp):
+        return [node.left, node.right]
+    if isinstance(node, ast.UnaryOp):
+        return [node.expr]
+    if isinstance(node, ast.FunctionCall):
+        return list(node.args)
+    if isinstance(node, ast.ArrayAccess):
+        return [node.index]
+    return []
+
+
+def _head(node):
+    """(cabeça da chave, segura) de um operador ou função; None para os restantes nós."""
+    if isinstance(node, ast.BinaryOp):
+        safe = node.op in SAFE_OPS or (
+            node.op in ('div', 'mod') and isinstance(node.right, ast.Number) and node.right.value != 0)
+        return ('bin', node.op), safe
+    if isinstance(node, ast.UnaryOp):
+        return ('un', node.op), True
+    if isinstance(node, ast.FunctionCall):
+        return ('call', node.name.lower()), node.name.lower() in SAFE_FUNCTIONS
+    return None
+
+
+def _key_all(expr, ids, versions, keys):
+    """Calcula (número, custo) de todas as subexpressões de `expr` numa só passagem."""
+    if isinstance(expr, ast.Variable):
+        keys[expr] = ids.setdefault(('var', expr.name, versions.get(expr.name, 0)), len(ids)), 1
+        return
+    if isinstance(expr, (ast.Number, ast.Boolean, ast.String, ast.CharLiteral)):
+        key = ('lit', type(expr).__name__, type(expr.value).__name__, expr.value)
+        keys[expr] = ids.setdefault(key, len(ids)), 1
+        return
+    children = _children(expr)
+    cost = 1
+    child_ids = []
+    for child in children:
+        _key_all(child, ids, versions, keys)
+        child_id, child_cost = keys[child]
+        child_ids.append(child_id)
+        cost += child_cost
+    head = _head(expr)
+    if head is None or not head[1] or None in child_ids:
+        keys[expr] = None, cost
+    else:
+        keys[expr] = ids.setdefault(head[0] + tuple(child_ids), len(ids)), cost
+
+
+def _expressions(stmt):
+    """Expressões avaliadas por uma instrução simples, pela ordem do CodeGenerator."""
+    if isinstance(stmt, ast.Assignment):
+        if isinstance(stmt.left, ast.ArrayAccess):
+            return [stmt.left.index, stmt.right]
+        return [stmt.right]
+    if isinstance(stmt, ast.ProcedureCall):
+        if stmt.name.lower() in ('read', 'readln'):
+            return [arg.index for arg in stmt.args if isinstance(arg, ast.ArrayAccess)]
+        return list(stmt.args)
+    if isinstance(stmt, ast.ReadlnAssignment) and isinstance(stmt.target, ast.ArrayAccess):
+        return [stmt.target.index]
+    return []
+
+
+def _assigned(stmt):
+    if isinstance(stmt, ast.Assignment):
+        targets = [stmt.left]
+    elif isinstance(stmt, ast.ReadlnAssignment):
+        targets = [stmt.target] if stmt.target is not None else []
+    elif isinstance(stmt, ast.ProcedureCall) and stmt.name.lower() in ('read', 'readln'):
+        targets = stmt.args
+    else:
+        targets = []
+    return [target.array.name if isinstance(target, ast.ArrayAccess) else target.name
+            for target in targets if isinstance(target, (ast.ArrayAccess, ast.Variable))]
+
+
+def _rewrite(expr, replacement):
+    name = replacement.get(expr)
+    if name is not None:
+        return ast.copy_position(ast.Variable(name=name), expr)
+    return _rewrite_children(expr, replacement)
+
+
+def _rewrite_children(expr, replacement):
+    if isinstance(expr, ast.BinaryOp):
+        expr.left = _rewrite(expr.left, replacement)
+        expr.right = _rewrite(expr.right, replacement)
+    elif isinstance(expr, ast.UnaryOp):
+        expr.expr = _rewrite(expr.expr, replacement)
+    elif isinstance(expr, ast.FunctionCall):
+        expr.args = [_rewrite(arg, replacement) for arg in expr.args]
+    elif isinstance(expr, ast.ArrayAccess):
+        expr.index = _rewrite(expr.index, replacement)
+    return expr
+
+
+def _rewrite_statement(stmt, replacement):
+    if isinstance(stmt, ast.Assignment):
+        if isinstance(stmt.left, ast.ArrayAccess):
+            stmt.left.index = _rewrite(stmt.left.index, replacement)
+        stmt.right = _rewrite(stmt.right, replacement)
+    elif isinstance(stmt, ast.ProcedureCall):
+        stmt.args = [_rewrite(arg, replacement) if not isinstance(arg, ast.ArrayAccess)
+                     else _rewrite_children(arg, replacement) for arg in stmt.args]
+    elif isinstance(stmt, ast.ReadlnAssignment) and isinstance(stmt.target, ast.ArrayAccess):
+        stmt.target.index = _rewrite(stmt.target.index, replacement)
+
+
+def eliminate_common_subexpressions(tree):
+    """Devolve a AST com as subexpressões repetidas de cada bloco básico calculadas uma vez."""
+    analyzer = SemanticAnalyzer()
+    analyzer.analyze(tree)
+    return CommonSubexpressionEliminator(analyzer.types).eliminate(tree)
@@ -0,0 +1,384 @@
+"""Interpretador local da EWVM para executar e medir o código gerado.
+
+O programa em texto é pré-descodificado (`load`) em dois arrays paralelos —
+opcodes inteiros e operandos já convertidos, com os saltos resolvidos para
+endereços — para que o ciclo de execução (`run`) seja só despacho.
+
+Representação dos valores: inteiros e reais são números Python; strings são
+listas de caracteres (mutáveis, para que `setcharat` altere a string guardada
+na variável global); blocos de `allocn` são listas Python.
+
+Como na EWVM, o frame global é formado pelos valores empilhados antes de
+`start` (`pushi 0` por variável, `pushn n` por array): `start` passa-os da
+pilha para a lista das variáveis globais, e `pushg`/`storeg` fora desse frame
+são um erro. `pushgp` empilha a própria lista das variáveis globais, por isso
+`loadn`/`storen` acedem da mesma forma aos arrays guardados no frame global e
+aos blocos da heap.
+
+Uso: python ewvm.py <output.txt | output.ewvb> [--input ficheiro]
+"""
+import sys
+import time
+
+OPCODES = (
+    'pushi', 'pushf', 'pushs', 'pushg', 'storeg', 'pushn', 'dup', 'pop', 'swap',
+    'add', 'sub', 'mul', 'div', 'mod', 'neg',
+    'fadd', 'fsub', 'fmul', 'fdiv', 'fsqrt', 'itof', 'ftoi',
+    'equal', 'inf', 'infeq', 'sup', 'supeq', 'finf', 'finfeq', 'fsup', 'fsupeq',
+    'and', 'or', 'not',
+    'jump', 'jz',
+    'allocn', 'loadn', 'storen',
+    'charat', 'setcharat', 'strlen', 'chr',
+    'read', 'atoi', 'atof',
+    'writei', 'writef', 'writes', 'writechr', 'writeln',
+    'start', 'stop', 'nop', 'err', 'pushgp',
+)
+OP = {name: code for code, name in enumerate(OPCODES)}
+
+JUMP_OPS = {'jump', 'jz'}
+INT_OPERAND_OPS = {'pushi', 'pushg', 'storeg', 'pushn', 'dup', 'pop'}
+
+
+class EWVMError(Exception):
+    # Índice da instrução onde a execução falhou (None para erros de carregamento)
+    instruction = None
+
+
+class Program:
+    """Programa descodificado: opcodes, operandos e tabela de labels."""
+
+    def __init__(self, ops, args, labels, source):
+        self.ops = ops
+        self.args = args
+        self.labels = labels
+        self.source = source
+
+    def __len__(self):
+        return len(self.ops)
+
+
+class ExecutionResult:
+    def __init__(self, instructions, wall_time, output, globals_, stack):
+        self.instructions = instructions
+        self.wall_time = wall_time
+        self.output = output
+        self.globals = globals_
+        self.stack = stack
+
+    def __repr__(self):
+        return f"ExecutionResult(instructions={self.instructions}, wall_time={self.wall_time:.6f})"
+
+
+def _parse_string(text):
+    start = text.find('"')
+    end = text.rfind('"')
+    if start == -1 or end <= start:
+        raise EWVMError(f"Malformed string operand: {text}")
+    return text[start + 1:end].replace('\\n', '\n').replace('\\"', '"')
+
+
+def _split_instructions(text):
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        if not line.startswith(('pushs', 'err')):
+            line = line.split('//', 1)[0].strip()
+        yield line
+
+
+def load(text):
+    """Descodifica o texto de um programa EWVM num Program."""
+    ops = []
+    raw_args = []
+    labels = {}
+    for line in _split_instructions(text):
+        if line.endswith(':'):
+            if line[:-1] in labels:
+                raise EWVMError(f"Duplicate label: {line[:-1]}")
+            labels[line[:-1]] = len(ops)
+            continue
+        name, _, operand = line.partition(' ')
+        name = name.lower()
+        if name not in OP:
+            raise EWVMError(f"Unknown instruction: {line}")
+        ops.append(OP[name])
+        raw_args.append((name, operand.strip()))
+
+    args = []
+    for name, operand in raw_args:
+        if name in JUMP_OPS:
+            if operand not in labels:
+                raise EWVMError(f"Undefined label: {operand}")
+            args.append(labels[operand])
+        elif name in INT_OPERAND_OPS:
+            args.append(int(operand) if operand else 1)
+        elif name == 'pushf':
+            args.append(float(operand))
+        elif name in ('pushs', 'err'):
+            args.append(_parse_string(operand))
+        else:
+            args.append(None)
+    return Program(ops, args, labels, text)
+
+
+def _truncating_div(a, b):
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+
+def _text(value):
+    return ''.join(value) if isinstance(value, list) else str(value)
+
+
+def run(program, inputs=None, output=None, max_steps=None):
+    """Executa `program` e devolve um ExecutionResult.
+
+    `inputs` é um iterável de linhas para `read` (por omissão stdin);
+    `output` é um ficheiro de escrita (por omissão a saída é só acumulada).
+    """
+    if isinstance(program, str):
+        program = load(program)
+    ops = program.ops
+    args = program.args
+    n_ops = len(ops)
+    input_lines = iter(inputs) if inputs is not None else iter(sys.stdin.readline, '')
+    written = []
+    write = written.append
+
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    globals_ = []
+    limit = max_steps if max_steps is not None else -1
+
+    (PUSHI, PUSHF, PUSHS, PUSHG, STOREG, PUSHN, DUP, POP, SWAP,
+     ADD, SUB, MUL, DIV, MOD, NEG,
+     FADD, FSUB, FMUL, FDIV, FSQRT, ITOF, FTOI,
+     EQUAL, INF, INFEQ, SUP, SUPEQ, FINF, FINFEQ, FSUP, FSUPEQ,
+     AND, OR, NOT,
+     JUMP, JZ,
+     ALLOCN, LOADN, STOREN,
+     CHARAT, SETCHARAT, STRLEN, CHR,
+     READ, ATOI, ATOF,
+     WRITEI, WRITEF, WRITES, WRITECHR, WRITELN,
+     START, STOP, NOP, ERR, PUSHGP) = range(len(OPCODES))
+
+    pc = 0
+    steps = 0
+    started = time.perf_counter()
+    try:
+        while pc < n_ops:
+            if steps == limit:
+                raise EWVMError(f"Step limit of {max_steps} instructions exceeded")
+            op = ops[pc]
+            steps += 1
+            pc += 1
+            if op == PUSHG:
+                n = args[pc - 1]
+                if n < 0:
+                    raise EWVMError(f"Global address {n} out of bounds")
+                push(globals_[n])
+            elif op == PUSHI:
+                push(args[pc - 1])
+            elif op == STOREG:
+                n = args[pc - 1]
+                if n < 0:
+                    raise EWVMError(f"Global address {n} out of bounds")
+                globals_[n] = pop()
+            elif op == JZ:
+                if not pop():
+                    pc = args[pc - 1]
+            elif op == JUMP:
+                pc = args[pc - 1]
+            elif op == ADD:
+                b = pop(); push(pop() + b)
+            elif op == SUB:
+                b = pop(); push(pop() - b)
+            elif op == MUL:
+                b = pop(); push(pop() * b)
+            elif op == INFEQ:
+                b = pop(); push(1 if pop() <= b else 0)
+            elif op == INF:
+                b = pop(); push(1 if pop() < b else 0)
+            elif op == SUPEQ:
+                b = pop(); push(1 if pop() >= b else 0)
+            elif op == SUP:
+                b = pop(); push(1 if pop() > b else 0)
+            elif op == EQUAL:
+                b = pop(); push(1 if pop() == b else 0)
+            elif op == PUSHGP:
+                push(globals_)
+            elif op == LOADN:
+                n = pop()
+                if n < 0:
+                    raise EWVMError(f"Address {n} out of bounds")
+                push(pop()[n])
+            elif op == STOREN:
+                v = pop(); n = pop()
+                if n < 0:
+                    raise EWVMError(f"Address {n} out of bounds")
+                pop()[n] = v
+            elif op == DUP:
+                n = args[pc - 1]
+                if not 0 <= n <= len(stack):
+                    raise EWVMError(f"Cannot duplicate {n} values from a stack of {len(stack)}")
+                if n:
+                    stack.extend(stack[-n:])
+            elif op == DIV:
+                b = pop(); a = pop()
+                if b == 0:
+                    raise EWVMError("Division by zero")
+                push(_truncating_div(a, b))
+            elif op == MOD:
+                b = pop(); a = pop()
+                if b == 0:
+                    raise EWVMError("Division by zero")
+                push(a - b * _truncating_div(a, b))
+            elif op == NOT:
+                push(0 if pop() else 1)
+            elif op == AND:
+                b = pop(); push(1 if pop() and b else 0)
+            elif op == OR:
+                b = pop(); push(1 if pop() or b else 0)
+            elif op == NEG:
+                push(-pop())
+            elif op == PUSHF:
+                push(args[pc - 1])
+            elif op == PUSHS:
+                push(list(args[pc - 1]))
+            elif op == FADD:
+                b = pop(); push(float(pop()) + b)
+            elif op == FSUB:
+                b = pop(); push(float(pop()) - b)
+            elif op == FMUL:
+                b = pop(); push(float(pop()) * b)
+            elif op == FDIV:
+                b = pop(); a = pop()
+                if b == 0:
+                    raise EWVMError("Division by zero")
+                push(float(a) / b)
+            elif op == FINF:
+                b = pop(); push(1 if pop() < b else 0)
+            elif op == FINFEQ:
+                b = pop(); push(1 if pop() <= b else 0)
+            elif op == FSUP:
+                b = pop(); push(1 if pop() > b else 0)
+            elif op == FSUPEQ:
+                b = pop(); push(1 if pop() >= b else 0)
+            elif op == FSQRT:
+                push(float(pop()) ** 0.5)
+            elif op == ITOF:
+                push(float(pop()))
+            elif op == FTOI:
+                push(int(pop()))
+            elif op == CHARAT:
+                n = pop()
+                if n < 0:
+                    raise EWVMError(f"String index {n} out of bounds")
+                push(ord(pop()[n]))
+            elif op == SETCHARAT:
+                c = pop(); n = pop()
+                if n < 0:
+                    raise EWVMError(f"String index {n} out of bounds")
+                pop()[n] = chr(c) if isinstance(c, int) else _text(c)[:1]
+            elif op == STRLEN:
+                push(len(pop()))
+            elif op == CHR:
+                push(list(chr(pop())))
+            elif op == PUSHN:
+                stack.extend([0] * args[pc - 1])
+            elif op == POP:
+                n = args[pc - 1]
+                # `del stack[-0:]` apagaria a pilha toda
+                if not 0 <= n <= len(stack):
+                    raise EWVMError(f"Cannot pop {n} values from a stack of {len(stack)}")
+                if n:
+                    del stack[-n:]
+            elif op == SWAP:
+                b = pop(); a = pop(); push(b); push(a)
+            elif op == ALLOCN:
+                push([0] * pop())
+            elif op == READ:
+                push(list(next(input_lines, '').rstrip('\n')))
+            elif op == ATOI:
+                text = _text(pop()).strip()
+                try:
+                    push(int(text))
+                except ValueError:
+                    raise EWVMError(f"Invalid integer input: {text!r}") from None
+            elif op == ATOF:
+                text = _text(pop()).strip()
+                try:
+                    push(float(text))
+                except ValueError:
+                    raise EWVMError(f"Invalid real input: {text!r}") from None
+            elif op == WRITEI:
+                write(str(pop()))
+            elif op == WRITEF:
+                write(str(float(pop())))
+            elif op == WRITES:
+                write(_text(pop()))
+            elif op == WRITECHR:
+                v = pop()
+                write(chr(v) if isinstance(v, int) else _text(v))
+            elif op == WRITELN:
+                write('\n')
+            elif op == STOP:
+                break
+            elif op == START:
+                # O que foi empilhado até aqui passa a ser o frame global
+                globals_[:] = stack
+                stack.clear()
+            elif op == NOP:
+                pass
+            elif op == ERR:
+                raise EWVMError(f"Runtime error at instruction {pc - 1}: {args[pc - 1]}")
+            else:
+                raise EWVMError(f"Unknown opcode {op} at {pc - 1}")
+    except IndexError as error:
+        failure = EWVMError(f"Stack or memory access error at instruction {pc - 1}: {error}")
+        failure.instruction = pc - 1
+        raise failure from None
+    except EWVMError as error:
+        error.instruction = pc - 1
+        raise
+    finally:
+        # Em caso de erro, a saída produzida até lá também é escrita
+        text = ''.join(written)
+        if output is not None:
+            output.write(text)
+    wall_time = time.perf_counter() - started
+    return ExecutionResult(steps, wall_time, text, globals_, stack)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Executa código EWVM localmente.")
+    arg_parser.add_argument('filename')
+    arg_parser.add_argument('--input', help="ficheiro com as linhas lidas por read (por omissão stdin)")
+    arg_parser.add_argument('--source-map', help="source map (output.map.json) para indicar a linha do fonte dos erros")
+    args = arg_parser.parse_args()
+    mappings = None
+    try:
+        import ewvm_binary
+        with open(args.filename, 'rb') as file:
+            data = file.read()
+        # Aceita tanto o texto de output.txt como o formato binário de ewvm_binary
+        program = ewvm_binary.load_binary(data) if ewvm_binary.is_binary(data) else load(data.decode('utf-8'))
+        if args.source_map:
+            import source_map
+            with open(args.source_map, 'r', encoding='utf-8') as file:
+                mappings = source_map.load(file)
+        inputs = None
+        if args.input:
+            with open(args.input, 'r', encoding='utf-8') as file:
+                inputs = file.read().splitlines()
+        result = run(program, inputs=inputs, output=sys.stdout)
+        print(f"\n{result.instructions} instructions executed in {result.wall_time:.6f}s", file=sys.stderr)
+    except FileNotFoundError as error:
+        print(f"Error: File '{error.filename}' not found.")
+    except EWVMError as error:
+        location = source_map.describe(mappings, error.instruction) if mappings is not None else None
+        print(f"EWVM error: {error}" + (f" (source {location})" if location else ""))
@@ -0,0 +1,238 @@
+"""Formato binário compacto dos programas EWVM (`.ewvb`).
+
+O texto de `output.txt` tem uma mnemónica por linha e labels como strings;
+para programas grandes ocupa muito espaço e `ewvm.load` tem de o voltar a
+analisar linha a linha. O formato binário guarda o programa já descodificado:
+
+    cabeçalho   '<4sBBIIIII': magic b'EWVB', versão, largura dos operandos (1, 2,
+                4 ou 8 bytes), nº de instruções, labels, aliases, strings e reais
+    opcodes     um byte por instrução (índice em `ewvm.OPCODES`)
+    operandos   um inteiro com sinal por instrução, na largura mais estreita que
+                serve ao programa: o valor (pushi, pushg, dup, ...), o endereço
+                já resolvido dos saltos, ou o índice na tabela de reais (pushf)
+                ou de strings (pushs, err); 0 nas instruções sem operando
+    reais       '<d' por entrada
+    strings     por entrada: comprimento '<I' e bytes UTF-8 (sem repetições; os
+                nomes das labels também estão aqui)
+    labels      por label, pela ordem do texto: índice do nome nas strings e
+                índice da instrução, ambos '<I'
+    aliases     saltos para uma label que não é a primeira do seu endereço (ex.:
+                `ENDIF3:` logo seguida de `ENDWHILE2:`): índice da instrução e
+                índice da label, ambos '<I'; só servem para `decode`
+
+`load_binary` reconstrói um `ewvm.Program` copiando os arrays de opcodes e de
+operandos de uma vez (`array.frombytes`), sem analisar texto. `decode` volta a
+produzir o texto: `decode(encode(code))` é igual ao código que o CodeGenerator
+emite, exceto aspas dentro de strings, que passam a ser escritas como `\"`
+(comentários e espaços extra de texto escrito à mão não são guardados).
+
+Uso: python ewvm_binary.py <output.txt> [-o output.ewvb]
+     python ewvm_binary.py --decode <output.ewvb> [-o output.txt]
+"""
+import re
+import struct
+import sys
+from array import array
+
+import ewvm
+
+MAGIC = b'EWVB'
+VERSION = 2
+HEADER = struct.Struct('<4sBBIIIII')
+# Largura dos operandos em bytes -> typecode do array (com sinal)
+WIDTH_TYPECODES = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+
+FLOAT_OPS = ('pushf',)
+STRING_OPS = ('pushs', 'err')
+
+
+def _width(operands):
+    low, high = min(operands, default=0), max(operands, default=0)
+    for width in WIDTH_TYPECODES:
+        limit = 1 << (8 * width - 1)
+        if -limit <= low and high < limit:
+            return width
+    raise ewvm.EWVMError(f"Operand out of range for the binary format: {low if low < -high else high}")
+
+
+def encode(code):
+    """Codifica um programa EWVM (texto, Program ou lista de instruções do CodeGenerator) em bytes."""
+    if not isinstance(code, ewvm.Program):
+        code = ewvm.load(code if isinstance(code, str) else "\n".join(code))
+    strings = {}
+    floats = []
+    operands = []
+    first_label = {}
+    for name, index in code.labels.items():
+        first_label.setdefault(index, name)
+    jump_labels = _jump_labels(code.source) if code.source is not None else {}
+    aliases = []
+    for op, arg in zip(code.ops, code.args):
+        name = ewvm.OPCODES[op]
+        if name in ewvm.JUMP_OPS:
+            label = jump_labels.get(len(operands))
+            if label is not None and label != first_label[arg]:
+                aliases.append((len(operands), label))
+            operands.append(arg)
+        elif name in STRING_OPS:
+            operands.append(strings.setdefault(arg, len(strings)))
+        elif name in FLOAT_OPS:
+            operands.append(len(floats))
+            floats.append(arg)
+        elif arg is None:
+            operands.append(0)
+        else:
+            operands.append(arg)
+    labels = [(strings.setdefault(name, len(strings)), index) for name, index in code.labels.items()]
+    aliases = [(index, strings[name]) for index, name in aliases]
+
+    width = _width(operands)
+    parts = [
+        HEADER.pack(MAGIC, VERSION, width, len(code.ops), len(labels), len(aliases), len(strings), len(floats)),
+        bytes(code.ops),
+        _little_endian(array(WIDTH_TYPECODES[width], operands)).tobytes(),
+        struct.pack(f'<{len(floats)}d', *floats),
+    ]
+    for text in strings:
+        data = text.encode('utf-8')
+        parts.append(struct.pack('<I', len(data)))
+        parts.append(data)
+    parts.append(struct.pack(f'<{2 * len(labels)}I', *(value for label in labels for value in label)))
+    parts.append(struct.pack(f'<{2 * len(aliases)}I', *(value for alias in aliases for value in alias)))
+    return b''.join(parts)
+
+
+def _jump_labels(text):
+    """Índice da instrução -> label escrita no texto, para cada salto."""
+    result = {}
+    index = 0
+    for line in ewvm._split_instructions(text):
+        if line.endswith(':'):
+            continue
+        name, _, operand = line.partition(' ')
+        if name.lower() in ewvm.JUMP_OPS:
+            result[index] = operand.strip()
+        index += 1
+    return result
+
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _read(data):
+    """Descodifica as tabelas de `data`: (ops, operandos, reais, strings, labels, aliases)."""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ewvm.EWVMError("Not an EWVM binary program: file too short")
+    magic, version, width, n_ops, n_labels, n_aliases, n_strings, n_floats = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ewvm.EWVMError("Not an EWVM binary program: bad magic number")
+    if version != VERSION or width not in WIDTH_TYPECODES:
+        raise ewvm.EWVMError(f"Unsupported EWVM binary format (version {version}, operand width {width})")
+    try:
+        offset = HEADER.size
+        ops = bytes(view[offset:offset + n_ops])
+        offset += n_ops
+        operands = array(WIDTH_TYPECODES[width])
+        operands.frombytes(view[offset:offset + n_ops * width])
+        _little_endian(operands)
+        offset += n_ops * width
+        floats = struct.unpack_from(f'<{n_floats}d', view, offset)
+        offset += 8 * n_floats
+        strings = []
+        for _ in range(n_strings):
+            (length,) = struct.unpack_from('<I', view, offset)
+            offset += 4
+            strings.append(str(view[offset:offset + length], 'utf-8'))
+            offset += length
+        label_values = struct.unpack_from(f'<{2 * n_labels}I', view, offset)
+        offset += 8 * n_labels
+        alias_values = struct.unpack_from(f'<{2 * n_aliases}I', view, offset)
+    except (struct.error, ValueError) as error:
+        raise ewvm.EWVMError(f"Truncated or corrupt EWVM binary program: {error}") from None
+    if len(ops) != n_ops or len(operands) != n_ops:
+        raise ewvm.EWVMError("Truncated or corrupt EWVM binary program")
+    if ops and max(ops) >= len(ewvm.OPCODES):
+        raise ewvm.EWVMError(f"Corrupt EWVM binary program: unknown opcode {max(ops)}")
+    try:
+        labels = {strings[label_values[i]]: label_values[i + 1] for i in range(0, len(label_values), 2)}
+        aliases = {alias_values[i]: strings[alias_values[i + 1]] for i in range(0, len(alias_values), 2)}
+    except IndexError:
+        raise ewvm.EWVMError("Corrupt EWVM binary program: bad string index") from None
+    return ops, operands, floats, strings, labels, aliases
+
+
+def load_binary(data):
+    """Reconstrói o `ewvm.Program` de um programa binário, pronto para `ewvm.run`."""
+    ops, operands, floats, strings, labels, _ = _read(data)
+    args = operands.tolist()
+    # Só as instruções com reais ou strings precisam de ser corrigidas; são encontradas
+    # procurando o byte do opcode em vez de percorrer o programa em Python
+    for name in FLOAT_OPS + STRING_OPS:
+        table = floats if name in FLOAT_OPS else strings
+        for match in re.finditer(re.escape(bytes([ewvm.OP[name]])), ops):
+            index = match.start()
+            args[index] = table[args[index]]
+    return ewvm.Program(ops, args, labels, None)
+
+
+def decode(data):
+    """Texto EWVM equivalente ao programa binário `data`."""
+    ops, operands, floats, strings, labels, aliases = _read(data)
+    names = {}
+    for name, index in labels.items():
+        names.setdefault(index, []).append(name)
+    targets = {index: group[0] for index, group in names.items()}
+    lines = []
+    for index, op in enumerate(ops):
+        lines.extend(f"{name}:" for name in names.get(index, ()))
+        name = ewvm.OPCODES[op]
+        operand = operands[index]
+        if name in ewvm.JUMP_OPS:
+            lines.append(f"{name} {aliases.get(index) or targets[operand]}")
+        elif name in STRING_OPS:
+            text = strings[operand].replace('"', '\\"').replace('\n', '\\n')
+            lines.append(f'{name} "{text}"')
+        elif name in FLOAT_OPS:
+            lines.append(f"{name} {floats[operand]}")
+        elif name in ewvm.INT_OPERAND_OPS:
+            lines.append(f"{name} {operand}")
+        else:
+            lines.append(name)
+    lines.extend(f"{name}:" for name in names.get(len(ops), ()))
+    return "\n".join(lines)
+
+
+def is_binary(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+if __name__ == '__main__':
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Converte código EWVM entre texto e o formato binário.")
+    arg_parser.add_argument('filename')
+    arg_parser.add_argument('--decode', action='store_true', help="converte um .ewvb de volta para texto")
+    arg_parser.add_argument('-o', '--output', help="ficheiro de saída (por omissão .ewvb/.txt ao lado da entrada)")
+    args = arg_parser.parse_args()
+    stem = args.filename.rsplit('.', 1)[0]
+    try:
+        if args.decode:
+            with open(args.filename, 'rb') as file:
+                text = decode(file.read())
+            with open(args.output or stem + '.txt', 'w', encoding='utf-8') as file:
+                file.write(text)
+        else:
+            with open(args.filename, 'r', encoding='utf-8') as file:
+                data = encode(file.read())
+            with open(args.output or stem + '.ewvb', 'wb') as file:
+                file.write(data)
+    except FileNotFoundError as error:
+        print(f"Error: File '{error.filename}' not found.")
+        sys.exit(1)
+    except ewvm.EWVMError as error:
+        print(f"EWVM error: {error}")
+        sys.exit(1)
@@ -1,6 +1,8 @@
+import sys
 
 import ply.lex as lex
 from ply.lex import TOKEN
+from ply_cache import build_lexer
 
 tokens = (
     'cCHAR', 'cINTEGER', 'cREAL', 'cBOO', 'cSTRING', 
@@ -44,7 +46,8 @@ def t_newline(t):
 
 def t_COMMENT(t):
     r'\{[^}]*\}'
-    pass
+    # Comentários com várias linhas também contam para as posições dos tokens seguintes
+    t.lexer.lineno += t.value.count('\n')
 
 def t_cCHAR(t):
     r"'([^']|\\')'"
@@ -56,11 +59,6 @@ def t_cSTRING(t):
     t.value = t.value[1:-1]
     return t
 
-def t_cBOO(t):
-    r'true|false'
-    t.value = True if t.value == 'true' else False
-    return t
-
 @TOKEN(r'[0-9]+\.[0-9]+([eE][+-]?[0-9]+)?')
 def t_cREAL(t):
     t.value = float(t.value)
@@ -76,74 +74,37 @@ def t_cINTEGER(t):
         t.value = int(t.value)
     return t
 
-
-
-@TOKEN(r'(?i:abs|chr|odd|ord|pred|sqr|sqrt|succ|length)\b')
-def t_SYS_FUNCT(t):
-    t.value = t.value.lower()
-    return t
-
-@TOKEN(r'(?i:write|writeln|read|readln)\b')
-def t_SYS_PROC(t):
-    t.value = t.value.lower()
-    return t
-
-@TOKEN(r'(?i:boolean|char|integer|real)\b')
-def t_SYS_TYPE(t):
-    t.value = t.value.lower()
-    return t
-
-@TOKEN(r'(?i:and)\b')  
-def t_kAND(t): return t
-@TOKEN(r'(?i:array)\b')  
-def t_kARRAY(t): return t
-@TOKEN(r'(?i:begin)\b')   
-def t_kBEGIN(t): return t
-@TOKEN(r'(?i:do)\b')      
-def t_kDO(t): return t
-@TOKEN(r'(?i:else)\b')  
-def t_kELSE(t): return t
-@TOKEN(r'(?i:end)\b')   
-def t_kEND(t): return t
-@TOKEN(r'(?i:for)\b')   
-def t_kFOR(t): return t
-@TOKEN(r'(?i:if)\b')    
-def t_kIF(t): return t
-@TOKEN(r'(?i:mod)\b')   
-def t_kMOD(t): return t
-@TOKEN(r'(?i:not)\b')   
-def t_kNOT(t): return t
-@TOKEN(r'(?i:of)\b')   
-def t_kOF(t): return t
-@TOKEN(r'(?i:or)\b')     
-def t_kOR(t): return t
-@TOKEN(r'(?i:program)\b') 
-def t_kPROGRAM(t): return t
-@TOKEN(r'(?i:then)\b')  
-def t_kTHEN(t): return t
-@TOKEN(r'(?i:to)\b')    
-def t_kTO(t): return t
-@TOKEN(r'(?i:var)\b')    
-def t_kVAR(t): return t
-@TOKEN(r'(?i:while)\b')  
-def t_kWHILE(t): return t
-@TOKEN(r'(?i:div)\b')   
-def t_kDIV(t): return t
-@TOKEN(r'(?i:downto)\b') 
-def t_kDOWNTO(t): return t
+# Palavras reservadas, funções/procedimentos embutidos e tipos, por nome em minúsculas
+reserved = {
+    'and': 'kAND', 'array': 'kARRAY', 'begin': 'kBEGIN', 'do': 'kDO',
+    'downto': 'kDOWNTO', 'else': 'kELSE', 'end': 'kEND', 'for': 'kFOR',
+    'if': 'kIF', 'mod': 'kMOD', 'not': 'kNOT', 'of': 'kOF', 'or': 'kOR',
+    'program': 'kPROGRAM', 'then': 'kTHEN', 'to': 'kTO', 'var': 'kVAR',
+    'while': 'kWHILE', 'div': 'kDIV',
+    'true': 'cBOO', 'false': 'cBOO',
+    'abs': 'SYS_FUNCT', 'chr': 'SYS_FUNCT', 'odd': 'SYS_FUNCT', 'ord': 'SYS_FUNCT',
+    'pred': 'SYS_FUNCT', 'sqr': 'SYS_FUNCT', 'sqrt': 'SYS_FUNCT', 'succ': 'SYS_FUNCT',
+    'length': 'SYS_FUNCT',
+    'write': 'SYS_PROC', 'writeln': 'SYS_PROC', 'read': 'SYS_PROC', 'readln': 'SYS_PROC',
+    'boolean': 'SYS_TYPE', 'char': 'SYS_TYPE', 'integer': 'SYS_TYPE', 'real': 'SYS_TYPE',
+}
 
 @TOKEN(r'[a-zA-Z_][a-zA-Z0-9_]*')
 def t_yNAME(t):
+    lowered = t.value.lower()
+    token_type = reserved.get(lowered)
+    if token_type is not None:
+        t.type = token_type
+        t.value = lowered == 'true' if token_type == 'cBOO' else lowered
     return t
 
 def t_error(t):
     print(f"Illegal character '{t.value[0]}' at line {t.lineno}")
     t.lexer.skip(1)
 
-lexer = lex.lex()
+lexer = build_lexer(sys.modules[__name__])
 
 if __name__ == '__main__':
-    import sys
     try:
         filename = sys.argv[1]
         with open(filename, 'r') as file:
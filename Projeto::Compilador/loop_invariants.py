@@ -0,0 +1,203 @@
+"""Remoção de expressões invariantes dos ciclos `while` e `for` (-O1).
+
+Uma subexpressão do corpo (ou da condição de um `while`) é invariante quando
+nenhuma das variáveis que lê é alterada dentro do ciclo. As maiores
+subexpressões invariantes com pelo menos um operador e uma variável são
+calculadas uma vez antes do ciclo para uma variável auxiliar (`$inv0`,
+`$inv1`, ...; o `$` garante que não colide com nomes do programa) e o ciclo
+passa a ler essa variável.
+
+Como o corpo pode não chegar a executar, só são movidas expressões que não
+podem falhar: sem acessos a arrays/strings, sem `/`, e `div`/`mod` apenas
+por literais diferentes de zero. Os ciclos são tratados de fora para dentro,
+por isso cada expressão sai para o ciclo mais exterior em que é invariante.
+"""
+import ast_nodes as ast
+from semantic import SemanticAnalyzer
+
+HOISTABLE_TYPES = ('integer', 'real', 'boolean')
+SAFE_OPS = ('+', '-', '*', '=', '<>', '<', '<=', '>', '>=', 'and', 'or')
+SAFE_FUNCTIONS = ('abs', 'sqr', 'odd', 'succ', 'pred', 'ord', 'length')
+
+
+def assigned_names(node, names=None):
+    """Nomes de variáveis (e arrays) que podem ser alterados ao executar `node`."""
+    if names is None:
+        names = set()
+    if isinstance(node, list):
+        for item in node:
+            assigned_names(item, names)
+    elif isinstance(node, ast.Assignment):
+        target = node.left
+        names.add(target.array.name if isinstance(target, ast.ArrayAccess) else target.name)
+    elif isinstance(node, ast.ReadlnAssignment):
+        if node.target is not None:
+            target = node.target
+            names.add(target.array.name if isinstance(target, ast.ArrayAccess) else target.name)
+    elif isinstance(node, ast.ProcedureCall):
+        if node.name.lower() in ('read', 'readln'):
+            for arg in node.args:
+                names.add(arg.array.name if isinstance(arg, ast.ArrayAccess) else getattr(arg, 'name', None))
+    elif isinstance(node, ast.Compound):
+        assigned_names(node.statements, names)
+    elif isinstance(node, ast.IfStatement):
+        assigned_names(node.then_part, names)
+        assigned_names(node.else_part, names)
+    elif isinstance(node, ast.WhileStatement):
+        assigned_names(node.body, names)
+    elif isinstance(node, ast.ForStatement):
+        names.add(node.var_name)
+        assigned_names(node.body, names)
+    return names
+
+
+class LoopInvariantHoister:
+    def __init__(self, types):
+        self.types = types
+        self.temporaries = []
+
+    def hoist(self, node):
+        method = getattr(self, f"hoist_{type(node).__name__}", None)
+        if method is None:
+            return node
+        return method(node)
+
+    def hoist_list(self, node):
+        return [self.hoist(item) for item in node]
+
+    def hoist_Program(self, node):
+        node.block = self.hoist(node.block)
+        return node
+
+    def hoist_Block(self, node):
+        node.compound_statement = self.hoist(node.compound_statement)
+        if self.temporaries:
+            declarations = [ast.VarDeclaration(names=[name], type=var_type)
+                            for name, var_type in self.temporaries]
+            node.declarations = (node.declarations or []) + [ast.VarDeclarations(declarations)]
+        return node
+
+    def hoist_Compound(self, node):
+        node.statements = self.hoist(node.statements)
+        return node
+
+    def hoist_IfStatement(self, node):
+        node.then_part = self.hoist(node.then_part)
+        if node.else_part:
+            node.else_part = self.hoist(node.else_part)
+        return node
+
+    def hoist_WhileStatement(self, node):
+        assigned = assigned_names(node.body)
+        hoisted = []
+        node.condition = self._replace(node.condition, assigned, hoisted)
+        node.body = self._replace_in_statement(node.body, assigned, hoisted)
+        node.body = self.hoist(node.body)
+        return self._wrap(node, hoisted)
+
+    def hoist_ForStatement(self, node):
+        assigned = assigned_names(node.body)
+        assigned.add(node.var_name)
+        hoisted = []
+        node.body = self._replace_in_statement(node.body, assigned, hoisted)
+        node.body = self.hoist(node.body)
+        return self._wrap(node, hoisted)
+
+    def _wrap(self, loop, hoisted):
+        if not hoisted:
+            return loop
+        return ast.copy_position(ast.Compound(statements=hoisted + [loop]), loop)
+
+    def _replace_in_statement(self, node, assigned, hoisted):
+        """Substitui as subexpressões invariantes das expressões de um comando."""
+        if isinstance(node, list):
+            return [self._replace_in_statement(item, assigned, hoisted) for item in node]
+        if isinstance(node, ast.Compound):
+            node.statements = self._replace_in_statement(node.statements, assigned, hoisted)
+        elif isinstance(node, ast.Assignment):
+            if isinstance(node.left, ast.ArrayAccess):
+                node.left.index = self._replace(node.left.index, assigned, hoisted)
+            node.right = self._replace(node.right, assigned, hoisted)
+        elif isinstance(node, ast.ProcedureCall):
+            if node.name.lower() not in ('read', 'readln'):
+                node.args = [self._replace(arg, assigned, hoisted) for arg in node.args]
+        elif isinstance(node, ast.IfStatement):
+            node.condition = self._replace(node.condition, assigned, hoisted)
+            node.then_part = self._replace_in_statement(node.then_part, assigned, hoisted)
+            if node.else_part:
+                node.else_part = self._replace_in_statement(node.else_part, assigned, hoisted)
+        elif isinstance(node, ast.WhileStatement):
+            node.condition = self._replace(node.condition, assigned, hoisted)
+            node.body = self._replace_in_statement(node.body, assigned, hoisted)
+        elif isinstance(node, ast.ForStatement):
+            node.start_value = self._replace(node.start_value, assigned, hoisted)
+            node.end_value = self._replace(node.end_value, assigned, hoisted)
+            node.body = self._replace_in_statement(node.body, assigned, hoisted)
+        return node
+
+    def _replace(self, expr, assigned, hoisted):
+        """Devolve `expr` com as maiores subexpressões invariantes trocadas por temporárias."""
+        return self._hoist_if_worth(*self._visit(expr, assigned, hoisted), hoisted)
+
+    def _visit(self, expr, assigned, hoisted):
+        """Visita em pós-ordem; devolve (expr, invariante e segura, lê alguma variável).
+
+        Uma subexpressão invariante só é substituída quando o nó pai não o é, para
+        que saia a maior expressão invariante possível.
+        """
+        if isinstance(expr, (ast.Number, ast.Boolean, ast.String, ast.CharLiteral)):
+            return expr, True, False
+        if isinstance(expr, ast.Variable):
+            return expr, expr.name not in assigned, True
+        if isinstance(expr, ast.BinaryOp):
+            safe = expr.op in SAFE_OPS or (
+                expr.op in ('div', 'mod') and isinstance(expr.right, ast.Number) and expr.right.value != 0)
+            children = [self._visit(expr.left, assigned, hoisted), self._visit(expr.right, assigned, hoisted)]
+        elif isinstance(expr, ast.UnaryOp):
+            safe = True
+            children = [self._visit(expr.expr, assigned, hoisted)]
+        elif isinstance(expr, ast.FunctionCall):
+            safe = expr.name.lower() in SAFE_FUNCTIONS
+            children = [self._visit(arg, assigned, hoisted) for arg in expr.args]
+        elif isinstance(expr, ast.ArrayAccess):
+            safe = False
+            children = [self._visit(expr.index, assigned, hoisted)]
+        else:
+            return expr, False, False
+
+        has_variable = any(child[2] for child in children)
+        if safe and all(child[1] for child in children):
+            return expr, True, has_variable
+        replaced = [self._hoist_if_worth(*child, hoisted) for child in children]
+        if isinstance(expr, ast.BinaryOp):
+            expr.left, expr.right = replaced
+        elif isinstance(expr, ast.FunctionCall):
+            expr.args = replaced
+        elif isinstance(expr, ast.UnaryOp):
+            expr.expr = replaced[0]
+        else:
+            expr.index = replaced[0]
+        return expr, False, has_variable
+
+    def _hoist_if_worth(self, expr, invariant, has_variable, hoisted):
+        if invariant and has_variable and self._worth_hoisting(expr):
+            return self._new_temporary(expr, hoisted)
+        return expr
+
+    def _worth_hoisting(self, expr):
+        if not isinstance(expr, (ast.BinaryOp, ast.UnaryOp, ast.FunctionCall)):
+            return False
+        return self.types.get(expr) in HOISTABLE_TYPES
+
+    def _new_temporary(self, expr, hoisted):
+        name = f"$inv{len(self.temporaries)}"
+        self.temporaries.append((name, self.types[expr]))
+        hoisted.append(ast.copy_position(ast.Assignment(left=ast.Variable(name=name), right=expr), expr))
+        return ast.copy_position(ast.Variable(name=name), expr)
+
+
+def hoist_invariants(tree):
+    """Devolve a AST com as expressões invariantes calculadas antes dos ciclos."""
+    analyzer = SemanticAnalyzer()
+    analyzer.analyze(tree)
+    return LoopInvariantHoister(analyzer.types).hoist(tree)
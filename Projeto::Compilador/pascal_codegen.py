@@ -1,78 +1,210 @@
 import ast_nodes as ast
+from constant_folding import constant_value
+from semantic import SemanticAnalyzer
+from cse import expression_key
+from loop_invariants import assigned_names
+
+def _is_empty_statement(node):
+    """True se `node` não gera instruções (None, NoOp ou blocos só com NoOp)."""
+    if node is None or isinstance(node, ast.NoOp):
+        return True
+    if isinstance(node, ast.Compound):
+        return all(_is_empty_statement(stmt) for stmt in node.statements)
+    if isinstance(node, list):
+        return all(_is_empty_statement(stmt) for stmt in node)
+    return False
+
+def _first_evaluated(node):
+    """Primeira folha avaliada ao gerar a expressão `node`."""
+    while True:
+        if isinstance(node, ast.BinaryOp):
+            node = node.left
+        elif isinstance(node, ast.UnaryOp):
+            node = node.expr
+        elif isinstance(node, ast.FunctionCall) and node.args:
+            node = node.args[0]
+        else:
+            return node
+
+def _loop_slots_needed(node):
+    """Nº máximo de slots auxiliares em uso ao mesmo tempo pelos ciclos `for` de `node`.
+
+    Cada `for` cujo limite final não é um literal guarda-o num slot enquanto o ciclo
+    corre; os ciclos seguidos reutilizam o mesmo slot, os encaixados não.
+    """
+    if isinstance(node, list):
+        return max((_loop_slots_needed(stmt) for stmt in node), default=0)
+    if isinstance(node, ast.Compound):
+        return _loop_slots_needed(node.statements)
+    if isinstance(node, ast.IfStatement):
+        return max(_loop_slots_needed(node.then_part), _loop_slots_needed(node.else_part))
+    if isinstance(node, ast.WhileStatement):
+        return _loop_slots_needed(node.body)
+    if isinstance(node, ast.ForStatement):
+        own = 0 if isinstance(node.end_value, ast.Number) else 1
+        return own + _loop_slots_needed(node.body)
+    return 0
+
+class FileSink:
+    """Destino de instruções que as escreve logo num ficheiro em vez de as guardar.
+
+    Tem a mesma interface de `list` usada pelo CodeGenerator (`append`/`len`) e
+    produz exatamente o mesmo texto que `get_code`.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+        self._separator = ""
+
+    def append(self, instruction):
+        self.stream.write(self._separator + instruction)
+        self._separator = "\n"
+        self.count += instruction.count("\n") + 1
+
+    def __len__(self):
+        return self.count
 
 class CodeGenerator:
-    def __init__(self):
-        self.code = []
+    def __init__(self, sink=None, range_checks=False, source_map=False):
+        # Por omissão as instruções ficam numa lista; com um sink (ex.: FileSink)
+        # são enviadas para lá à medida que são geradas.
+        self.code = [] if sink is None else sink
+        # Com source_map, positions[i] é a posição (linha, coluna) no fonte do nó mais
+        # interior que estava a ser gerado quando a entrada code[i] foi emitida
+        self.positions = [] if source_map else None
+        self.position = None
+        # Com range_checks os índices dos arrays são verificados em tempo de execução,
+        # exceto quando o intervalo do índice é conhecido e cabe nos limites
+        self.range_checks = range_checks
+        self.range_errors = []
+        self.known_ranges = {}
         self.label_count = 0
         self.var_offset = 0
         self.symbol_table = {}
         self.type_info = {}
         self.array_info = {}
         self.string_info = {}
-        self.heap_allocated = False
+        # Pool de constantes: valor do literal -> slot global onde é guardado no arranque
         self.string_constants = {}
-        self.next_string_id = 0
+        self.pooled_literals = []
+        # Acesso a[i] cujo endereço (base e índice) já está no topo da pilha
+        self.address_on_stack = None
+        # Slots globais auxiliares (não declarados no programa), reservados antes de
+        # start, livres para reutilizar
+        self.free_slots = []
+        # Tipos das expressões, anotados de uma vez em generate_program
+        self.semantic = SemanticAnalyzer()
+
+    # Handler por classe de nó; resolvido uma vez por classe em _resolve_handler
+    _HANDLERS = {
+        ast.Program: 'generate_program',
+        ast.Block: 'generate_block',
+        ast.VarDeclarations: 'generate_var_declarations',
+        ast.VarDeclaration: 'generate_var_declaration',
+        ast.Compound: 'generate_compound',
+        ast.Assignment: 'generate_assignment',
+        ast.Variable: 'generate_variable',
+        ast.ArrayAccess: 'generate_array_access',
+        ast.ProcedureCall: 'generate_procedure_call',
+        ast.FunctionCall: 'generate_function_call',
+        ast.IfStatement: 'generate_if_statement',
+        ast.WhileStatement: 'generate_while_statement',
+        ast.ForStatement: 'generate_for_statement',
+        ast.BinaryOp: 'generate_binary_op',
+        ast.UnaryOp: 'generate_unary_op',
+        ast.Number: 'generate_number',
+        ast.String: 'generate_string',
+        ast.Boolean: 'generate_boolean',
+        ast.CharLiteral: 'generate_char_literal',
+        ast.NoOp: 'generate_noop',
+        ast.ReadlnAssignment: 'generate_readln_assignment',
+        list: 'generate_list',
+    }
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
 
     def generate(self, node):
-        if isinstance(node, ast.Program):
-            self.generate_program(node)
-        elif isinstance(node, ast.Block):
-            self.generate_block(node)
-        elif isinstance(node, ast.VarDeclarations):
-            self.generate_var_declarations(node)
-        elif isinstance(node, ast.VarDeclaration):
-            self.generate_var_declaration(node)
-        elif isinstance(node, ast.Compound):
-            self.generate_compound(node)
-        elif isinstance(node, ast.Assignment):
-            self.generate_assignment(node)
-        elif isinstance(node, ast.Variable):
-            self.generate_variable(node)
-        elif isinstance(node, ast.ArrayAccess):
-            self.generate_array_access(node)
-        elif isinstance(node, ast.ProcedureCall):
-            self.generate_procedure_call(node)
-        elif isinstance(node, ast.FunctionCall):
-            self.generate_function_call(node)
-        elif isinstance(node, ast.IfStatement):
-            self.generate_if_statement(node)
-        elif isinstance(node, ast.WhileStatement):
-            self.generate_while_statement(node)
-        elif isinstance(node, ast.ForStatement):
-            self.generate_for_statement(node)
-        elif isinstance(node, ast.BinaryOp):
-            self.generate_binary_op(node)
-        elif isinstance(node, ast.UnaryOp):
-            self.generate_unary_op(node)
-        elif isinstance(node, ast.Number):
-            self.generate_number(node)
-        elif isinstance(node, ast.String):
-            self.generate_string(node)
-        elif isinstance(node, ast.Boolean):
-            self.generate_boolean(node)
-        elif isinstance(node, ast.CharLiteral):
-            self.generate_char_literal(node)
-        elif isinstance(node, ast.NoOp):
-            pass
-        elif isinstance(node, ast.ReadlnAssignment):
-            self.generate_readln_assignment(node)
-        elif isinstance(node, list):
-            for item in node:
-                self.generate(item)
-        else:
-            raise ValueError(f"Unknown node type: {type(node)}")
+        handler = self._dispatch.get(node.__class__)
+        if handler is None:
+            handler = self._resolve_handler(node.__class__)
+        if self.positions is None:
+            handler(self, node)
+            return self.code
+        outer = self.position
+        lineno = getattr(node, 'lineno', None)
+        if lineno is not None:
+            self._set_position((lineno, node.column))
+        handler(self, node)
+        self._set_position(outer)
         return self.code
 
+    def _set_position(self, position):
+        """Atribui a posição atual às entradas já emitidas e passa a usar `position`."""
+        if self.positions is None:
+            return
+        pending = len(self.code) - len(self.positions)
+        if pending:
+            self.positions.extend([self.position] * pending)
+        self.position = position
+
+    @classmethod
+    def _resolve_handler(cls, node_class):
+        # Percorre o MRO para que subclasses de nós usem o handler da classe base
+        for klass in node_class.__mro__:
+            name = cls._HANDLERS.get(klass)
+            if name is not None:
+                handler = getattr(cls, name)
+                cls._dispatch[node_class] = handler
+                return handler
+        raise ValueError(f"Unknown node type: {node_class}")
+
+    def generate_list(self, node):
+        for item in node:
+            self.generate(item)
+
+    def generate_noop(self, node):
+        pass
+
     def generate_program(self, node):
+        self.analyze(node)
         self.generate(node.block)
 
+    def analyze(self, node):
+        """Análise semântica do programa `node`, feita antes de qualquer instrução ser emitida.
+
+        Anota os tipos das expressões e escolhe os literais do pool de constantes.
+        """
+        self.semantic.analyze(node)
+        self.pooled_literals = self.semantic.pooled_literals()
+
     def generate_block(self, node):
+        # O frame global é formado pelos valores empilhados antes de start, pela ordem
+        # dos slots: variáveis declaradas, literais do pool e slots auxiliares
         if node.declarations:
             self.generate(node.declarations)
+        # Cada literal distinto é materializado uma vez; os usos leem o slot com pushg
+        for value in self.pooled_literals:
+            self.string_constants[value] = self.var_offset
+            self.code.append(f'pushs "{value}"')
+            self.var_offset += 1
+        loop_slots = _loop_slots_needed(node.compound_statement)
+        if loop_slots:
+            self.code.append(f"pushn {loop_slots}")
+            self.free_slots = list(range(self.var_offset + loop_slots - 1, self.var_offset - 1, -1))
+            self.var_offset += loop_slots
         self.code.append("start")
         if node.compound_statement:
             self.generate(node.compound_statement)
         self.code.append("stop")
+        # Destinos das verificações de índices falhadas, fora do fluxo normal
+        for label, array_name, position in self.range_errors:
+            # O erro é atribuído ao acesso que o verificou
+            self._set_position(position)
+            self.code.append(f"{label}:")
+            self.code.append(f'err "Index out of range for array {array_name}"')
 
     def generate_var_declarations(self, node):
         for decl in node.declarations:
@@ -83,25 +215,25 @@ class CodeGenerator:
         
         for name in node.names:
             if isinstance(node.type, ast.ArrayType):
-                lower = node.type.index_range.lower.value
-                upper = node.type.index_range.upper.value
+                lower = constant_value(node.type.index_range.lower)
+                upper = constant_value(node.type.index_range.upper)
+                if not isinstance(lower, int) or not isinstance(upper, int) or isinstance(lower, bool) or isinstance(upper, bool):
+                    raise TypeError(f"Array bounds must be integer constants: {node.type.index_range}")
                 size = upper - lower + 1
-                
-                # Array allocation
-                self.code.append(f"pushi {size}")
-                self.code.append("allocn")
-                self.code.append(f"storeg {self.var_offset}")
-                
+
+                # Os elementos ocupam `size` slots globais consecutivos (sem allocn),
+                # reservados e inicializados a 0 por pushn
+                self.code.append(f"pushn {size}")
+
                 self.array_info[name] = {
-                    'pointer_offset': self.var_offset,
+                    'base': self.var_offset,
                     'lower_bound': lower,
                     'size': size,
                     'element_type': node.type.element_type.name.lower() if isinstance(node.type.element_type, ast.Type) else 'integer'
                 }
-                self.heap_allocated = True
                 self.symbol_table[name] = self.var_offset
                 self.type_info[name] = 'array'
-                self.var_offset += 1
+                self.var_offset += size
             else:
                 self.symbol_table[name] = self.var_offset
                 self.type_info[name] = var_type
@@ -119,16 +251,28 @@ class CodeGenerator:
                     self.code.append("pushs \"\0\"")
                 else:
                     self.code.append("pushi 0")
-                
-                self.code.append(f"storeg {self.var_offset}")
                 self.var_offset += 1
 
+    def _acquire_slot(self):
+        """Um slot global auxiliar (ex.: o limite de um ciclo for), dos reservados antes de start."""
+        return self.free_slots.pop()
+
+    def _release_slot(self, slot):
+        self.free_slots.append(slot)
+
     def generate_compound(self, node):
         for stmt in node.statements:
             self.generate(stmt)
 
     def generate_char_literal(self, node):
-        self.code.append(f"pushs \"{node.value}\"")
+        self._push_constant(node.value)
+
+    def _push_constant(self, value):
+        slot = self.string_constants.get(value)
+        if slot is not None:
+            self.code.append(f"pushg {slot}")
+        else:
+            self.code.append(f'pushs "{value}"')
 
     def generate_binary_op(self, node):
         left_is_string_access = isinstance(node.left, ast.ArrayAccess) and node.left.array.name in self.string_info
@@ -186,22 +330,8 @@ class CodeGenerator:
                 self.code.append(op_map[node.op])
 
     def generate_assignment(self, node):
+        # A compatibilidade dos tipos já foi verificada pelo SemanticAnalyzer
         left_type = self._get_expression_type(node.left)
-        right_type = self._get_expression_type(node.right)
-
-        if left_type != right_type:
-            # Permitir atribuição de boolean := true/false
-            if left_type == 'boolean' and isinstance(node.right, ast.Boolean):
-                pass
-            # Permitir char := 'c'
-            elif left_type == 'char' and isinstance(node.right, ast.CharLiteral):
-                pass
-            # Permitir real := integer → mas assume que o número já vem como float no AST (sem itof aqui!)
-            elif left_type == 'real' and right_type == 'integer':
-                pass  # assume que generate_number já fez pushf
-            else:
-                raise TypeError(f"Incompatible types in assignment: {left_type} := {right_type}")
-
 
         # Handle char variable assignment
         if isinstance(node.left, ast.Variable) and left_type == 'char':
@@ -213,7 +343,11 @@ class CodeGenerator:
             return
 
         # Generate the right-hand side value first (except for array assignments)
-        if not isinstance(node.left, ast.ArrayAccess):
+        if isinstance(node.right, ast.String):
+            # Literal atribuído: fora do pool, a variável fica com uma cópia própria
+            if not isinstance(node.left, ast.ArrayAccess):
+                self.code.append(f'pushs "{node.right.value}"')
+        elif not isinstance(node.left, ast.ArrayAccess):
             if isinstance(node.right, ast.CharLiteral):
                 self.generate_char_literal(node.right)
             else:
@@ -221,6 +355,9 @@ class CodeGenerator:
 
         # Handle variable assignment
         if isinstance(node.left, ast.Variable):
+            if self.range_checks and node.left.name.startswith('$'):
+                # Auxiliares do otimizador: são lidas só depois desta atribuição e antes da seguinte
+                self.known_ranges[node.left.name] = self._index_range(node.right)
             offset = self.symbol_table[node.left.name]
             var_type = self.type_info.get(node.left.name, 'integer')
             self.code.append(f"storeg {offset}")
@@ -229,19 +366,26 @@ class CodeGenerator:
         elif isinstance(node.left, ast.ArrayAccess):
             array_name = node.left.array.name
 
-            # First push array base address
+            # Push array base address and index (with lower bound adjustment if needed)
             if array_name in self.array_info:
-                self.code.append(f"pushg {self.array_info[array_name]['pointer_offset']}")
+                slot = self._generate_element_address(array_name, node.left.index)
+                if slot is not None:
+                    # Índice constante: o elemento é um slot global como outro qualquer
+                    self.generate(node.right)
+                    self.code.append(f"storeg {slot}")
+                    return
             elif array_name in self.string_info:
                 self.code.append(f"pushg {self.symbol_table[array_name]}")
+                self.generate(node.left.index)
             else:
                 raise ValueError(f"Unknown array/string: {array_name}")
 
-            # Then push index (with lower bound adjustment if needed)
-            self.generate(node.left.index)
-            if array_name in self.array_info and self.array_info[array_name]['lower_bound'] != 0:
-                self.code.append(f"pushi {self.array_info[array_name]['lower_bound']}")
-                self.code.append("sub")
+            # a[e] := a[e] op ...: o endereço já empilhado é reutilizado com dup 2
+            if array_name in self.array_info:
+                first = _first_evaluated(node.right)
+                if (isinstance(first, ast.ArrayAccess) and first.array.name == array_name
+                        and self._same_pure_expression(first.index, node.left.index)):
+                    self.address_on_stack = first
 
             # For array assignment, generate the value after pushing array and index
             if isinstance(node.right, ast.CharLiteral):
@@ -284,18 +428,85 @@ class CodeGenerator:
             self.code.append("pushi 1")
             self.code.append("sub")
             self.code.append("charat")
-        elif array_name in self.array_info:
-            array_data = self.array_info[array_name]
-            self.code.append(f"pushg {array_data['pointer_offset']}")
-            self.generate(node.index)
-            if array_data['lower_bound'] != 0:
-                self.code.append(f"pushi {array_data['lower_bound']}")
-                self.code.append("sub")
+        elif node is self.address_on_stack:
+            self.address_on_stack = None
+            self.code.append("dup 2")
             self.code.append("loadn")
+        elif array_name in self.array_info:
+            slot = self._generate_element_address(array_name, node.index)
+            if slot is not None:
+                self.code.append(f"pushg {slot}")
+            else:
+                self.code.append("loadn")
         else:
             raise ValueError(f"Unknown array/string: {array_name}")
 
 
+    def _generate_element_address(self, array_name, index):
+        """Endereço do elemento `array_name[index]` no frame global.
+
+        Com um índice constante dentro dos limites devolve o slot do elemento e não
+        emite nada. Caso contrário empilha `pushgp` e o slot (índice + base - limite
+        inferior, verificado com range_checks), prontos para loadn/storen, e devolve None.
+        """
+        array_data = self.array_info[array_name]
+        lower = array_data['lower_bound']
+        base = array_data['base']
+        size = array_data['size']
+        if (isinstance(index, ast.Number) and isinstance(index.value, int) and not isinstance(index.value, bool)
+                and lower <= index.value < lower + size):
+            return base + index.value - lower
+        self.code.append("pushgp")
+        self.generate(index)
+        offset = base - lower
+        if offset > 0:
+            self.code.append(f"pushi {offset}")
+            self.code.append("add")
+        elif offset < 0:
+            self.code.append(f"pushi {-offset}")
+            self.code.append("sub")
+        if not self.range_checks:
+            return None
+        index_range = self._index_range(index)
+        if index_range is not None and lower <= index_range[0] and index_range[1] < lower + size:
+            return None
+        label = f"RANGEERR{self.label_count}"
+        self.label_count += 1
+        self.range_errors.append((label, array_name, self.position))
+        self.code.append("dup 1")
+        self.code.append(f"pushi {base}")
+        self.code.append("supeq")
+        self.code.append(f"jz {label}")
+        self.code.append("dup 1")
+        self.code.append(f"pushi {base + size}")
+        self.code.append("inf")
+        self.code.append(f"jz {label}")
+        return None
+
+    def _index_range(self, node):
+        """Intervalo (mín, máx) dos valores de uma expressão inteira, ou None se não for conhecido."""
+        if isinstance(node, ast.Number):
+            return (node.value, node.value) if isinstance(node.value, int) else None
+        if isinstance(node, ast.Variable):
+            return self.known_ranges.get(node.name)
+        if isinstance(node, ast.BinaryOp) and node.op in ('+', '-', '*'):
+            left = self._index_range(node.left)
+            right = self._index_range(node.right)
+            if left is None or right is None:
+                return None
+            if node.op == '+':
+                return left[0] + right[0], left[1] + right[1]
+            if node.op == '-':
+                return left[0] - right[1], left[1] - right[0]
+            products = [a * b for a in left for b in right]
+            return min(products), max(products)
+        if isinstance(node, ast.FunctionCall) and node.name.lower() == 'length' and node.args:
+            arg = node.args[0]
+            if isinstance(arg, ast.Variable) and arg.name in self.array_info:
+                size = self.array_info[arg.name]['size']
+                return size, size
+        return None
+
     def generate_procedure_call(self, node):
         proc_name = node.name.lower()
         
@@ -331,18 +542,7 @@ class CodeGenerator:
                 if isinstance(target, ast.ArrayAccess):
                     array_name = target.array.name
                     if array_name in self.array_info:
-                        self.code.append(f"pushg {self.array_info[array_name]['pointer_offset']}")
-                        self.generate(target.index)
-                        if self.array_info[array_name]['lower_bound'] != 0:
-                            self.code.append(f"pushi {self.array_info[array_name]['lower_bound']}")
-                            self.code.append("sub")
-                        self.code.append("read")
-                        element_type = self.array_info[array_name]['element_type']
-                        if element_type == 'integer':
-                            self.code.append("atoi")
-                        elif element_type == 'real':
-                            self.code.append("atof")
-                        self.code.append("storen")
+                        self._generate_read_element(array_name, target.index)
                     elif array_name in self.string_info:
                         self.code.append(f"pushg {self.symbol_table[array_name]}")
                         self.generate(target.index)
@@ -362,8 +562,12 @@ class CodeGenerator:
 
     def generate_function_call(self, node):
         func_name = node.name.lower()
-        
-        if len(node.args) > 0:
+
+        # O tamanho de um array ou de um literal é constante: o argumento não é empilhado
+        constant_length = func_name == 'length' and len(node.args) > 0 and (
+            isinstance(node.args[0], ast.String) or
+            isinstance(node.args[0], ast.Variable) and node.args[0].name in self.array_info)
+        if len(node.args) > 0 and not constant_length:
             self.generate(node.args[0])
         
         if func_name == 'length':
@@ -380,7 +584,8 @@ class CodeGenerator:
             else:
                 raise ValueError("Length function can only be applied to strings or arrays")
         elif func_name == 'chr':
-            self.code.append("writechr")
+            # Converte o código num char (string de um carácter), como as variáveis char
+            self.code.append("chr")
         elif func_name == 'ord':
             pass
         elif func_name == 'pred':
@@ -415,25 +620,7 @@ class CodeGenerator:
         if isinstance(node.target, ast.ArrayAccess):
             array_name = node.target.array.name
             if array_name in self.array_info:
-                # Push array address and index first
-                self.code.append(f"pushg {self.array_info[array_name]['pointer_offset']}")
-                self.generate(node.target.index)
-                if self.array_info[array_name]['lower_bound'] != 0:
-                    self.code.append(f"pushi {self.array_info[array_name]['lower_bound']}")
-                    self.code.append("sub")
-                
-                # Read input
-                self.code.append("read")
-                
-                # Convert based on array element type
-                element_type = self.array_info[array_name]['element_type']
-                if element_type == 'integer':
-                    self.code.append("atoi")
-                elif element_type == 'real':
-                    self.code.append("atof")
-                
-                # Store the value
-                self.code.append("storen")
+                self._generate_read_element(array_name, node.target.index)
             elif array_name in self.string_info:
                 # Handle string character assignment
                 self.code.append(f"pushg {self.symbol_table[array_name]}")
@@ -457,33 +644,62 @@ class CodeGenerator:
                         self.code.append("atoi")
                         self.code.append(f"storeg {self.symbol_table[node.target.name]}")
 
+    def _generate_read_element(self, array_name, index):
+        """Lê uma linha para `array_name[index]`, convertida para o tipo dos elementos."""
+        slot = self._generate_element_address(array_name, index)
+        self.code.append("read")
+        element_type = self.array_info[array_name]['element_type']
+        if element_type == 'integer':
+            self.code.append("atoi")
+        elif element_type == 'real':
+            self.code.append("atof")
+        if slot is not None:
+            self.code.append(f"storeg {slot}")
+        else:
+            self.code.append("storen")
+
     def generate_if_statement(self, node):
         self.generate(node.condition)
         else_label = f"ELSE{self.label_count}"
         end_label = f"ENDIF{self.label_count}"
+        # Reserva o número já, antes de gerar os ramos: estruturas aninhadas têm labels próprias
+        self.label_count += 1
+        if _is_empty_statement(node.else_part):
+            # Sem else: basta saltar por cima do then
+            self.code.append(f"jz {end_label}")
+            self.generate(node.then_part)
+            self.code.append(f"{end_label}:")
+            return
         self.code.append(f"jz {else_label}")
         self.generate(node.then_part)
         self.code.append(f"jump {end_label}")
         self.code.append(f"{else_label}:")
-        if node.else_part:
-            self.generate(node.else_part)
+        self.generate(node.else_part)
         self.code.append(f"{end_label}:")
-        self.label_count += 1
 
     def generate_while_statement(self, node):
         start_label = f"WHILE{self.label_count}"
         end_label = f"ENDWHILE{self.label_count}"
+        self.label_count += 1
         self.code.append(f"{start_label}:")
         self.generate(node.condition)
         self.code.append(f"jz {end_label}")
         self.generate(node.body)
         self.code.append(f"jump {start_label}")
         self.code.append(f"{end_label}:")
-        self.label_count += 1
 
     def generate_for_statement(self, node):
         start_label = f"FOR{self.label_count}"
         end_label = f"ENDFOR{self.label_count}"
+        self.label_count += 1
+
+        # O limite final é avaliado uma só vez, antes da atribuição inicial (semântica
+        # do Pascal), e guardado num slot auxiliar; literais são comparados diretamente
+        end_slot = None
+        if not isinstance(node.end_value, ast.Number):
+            end_slot = self._acquire_slot()
+            self.generate(node.end_value)
+            self.code.append(f"storeg {end_slot}")
 
         # Inicializa a variável de controlo: i := start_value
         self.generate(ast.Assignment(
@@ -491,13 +707,27 @@ class CodeGenerator:
             right=node.start_value
         ))
 
+        # Intervalo da variável de controlo no corpo, para eliminar verificações de índices
+        if self.range_checks:
+            outer_range = self.known_ranges.pop(node.var_name, None)
+            start_range = self._index_range(node.start_value)
+            end_range = self._index_range(node.end_value)
+            if start_range and end_range and node.var_name not in assigned_names(node.body):
+                if node.direction == 'to':
+                    self.known_ranges[node.var_name] = (start_range[0], end_range[1])
+                else:
+                    self.known_ranges[node.var_name] = (end_range[0], start_range[1])
+
         self.code.append(f"{start_label}:")
 
         # IMPORTANTE: ordem correta de comparação
         # para "to": continua enquanto i <= end → termina quando i > end → sup
         # para "downto": continua enquanto i >= end → termina quando i < end → inf
         self.generate(ast.Variable(name=node.var_name))  # push i
-        self.generate(node.end_value)                   # push end
+        if end_slot is None:
+            self.generate(node.end_value)               # push end
+        else:
+            self.code.append(f"pushg {end_slot}")
 
         if node.direction == 'to':
             self.code.append("infeq")                     # i > end → TERMINA
@@ -520,7 +750,12 @@ class CodeGenerator:
 
         self.code.append(f"jump {start_label}")
         self.code.append(f"{end_label}:")
-        self.label_count += 1
+        if end_slot is not None:
+            self._release_slot(end_slot)
+        if self.range_checks:
+            self.known_ranges.pop(node.var_name, None)
+            if outer_range is not None:
+                self.known_ranges[node.var_name] = outer_range
 
 
     def generate_unary_op(self, node):
@@ -543,35 +778,27 @@ class CodeGenerator:
 
 
     def generate_string(self, node):
-        if node.value not in self.string_constants:
-            self.string_constants[node.value] = f"STR{self.next_string_id}"
-            self.next_string_id += 1
-        self.code.append(f'pushs "{node.value}"')
+        self._push_constant(node.value)
 
     def generate_boolean(self, node):
         self.code.append(f"pushi {1 if node.value else 0}")
 
+    def _same_pure_expression(self, a, b):
+        ids = {}
+        key = expression_key(a, ids)[0]
+        return key is not None and key == expression_key(b, ids)[0]
+
     def _get_expression_type(self, node):
-        if isinstance(node, ast.Number):
-            return 'real' if isinstance(node.value, float) else 'integer'
-        elif isinstance(node, ast.CharLiteral):
-            return 'char'
-        elif isinstance(node, ast.Variable):
-            return self.type_info.get(node.name, 'integer')
-        elif isinstance(node, ast.BinaryOp):
-            left_type = self._get_expression_type(node.left)
-            right_type = self._get_expression_type(node.right)
-            return 'real' if 'real' in [left_type, right_type] else 'integer'
-        elif isinstance(node, ast.ArrayAccess):
-            array_name = node.array.name
-            if array_name in self.array_info:
-                return self.array_info[array_name]['element_type']
-            elif array_name in self.string_info:
-                return 'char'
-            return 'integer'
-        elif isinstance(node, ast.String):
-            return 'string'
-        return 'integer'
+        return self.semantic.expression_type(node)
 
     def get_code(self):
-        return "\n".join(self.code)
\ No newline at end of file
+        if not isinstance(self.code, list):
+            raise ValueError("Code was streamed to a sink and is not kept in memory")
+        return "\n".join(self.code)
+
+    def get_positions(self):
+        """Posição no fonte de cada entrada de `code` (requer source_map=True)."""
+        if self.positions is None:
+            raise ValueError("CodeGenerator was created without source_map=True")
+        self._set_position(self.position)
+        return self.positions
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""Otimizador peephole sobre a lista de instruções EWVM gerada pelo CodeGenerator.
+
+Trabalha numa janela deslizante sobre o fim da lista de saída: cada instrução é
+acrescentada e os padrões são testados contra as últimas instruções emitidas, o
+que permite que uma simplificação exponha logo a seguinte. Entre janelas são
+removidas as labels sem saltos e as instruções inalcançáveis.
+
+`optimize_with_positions` faz o mesmo mantendo o source map: cada instrução
+leva a sua posição no fonte (`_Located`) e as que um padrão cria herdam a
+posição da instrução que substituem.
+"""
+
+
+class _Located(str):
+    """Instrução com a posição no fonte (linha, coluna) de onde foi gerada."""
+    __slots__ = ('position',)
+
+    def __new__(cls, text, position):
+        instr = super().__new__(cls, text)
+        instr.position = position
+        return instr
+
+
+def _like(text, original):
+    """`text` com a posição de `original`, se esta tiver uma."""
+    if isinstance(original, _Located):
+        return _Located(text, original.position)
+    return text
+
+
+def _is_label(instr):
+    return instr.endswith(':')
+
+
+def _operand(instr, opcode):
+    """Devolve o operando de `instr` se o opcode for `opcode`, senão None."""
+    if instr.startswith(opcode + ' '):
+        return instr[len(opcode) + 1:]
+    return None
+
+
+def _split(code, positions=None):
+    # Algumas entradas do CodeGenerator contêm várias instruções ("equal\nnot")
+    lines = []
+    if positions is None:
+        for entry in code:
+            lines.extend(line for line in entry.split('\n') if line)
+    else:
+        for entry, position in zip(code, positions):
+            lines.extend(_Located(line, position) for line in entry.split('\n') if line)
+    return lines
+
+
+def _resolve_label_chains(code):
+    """Redireciona saltos para o destino final de cadeias de labels/saltos."""
+    alias = {}
+    target = {}
+    group = []
+    for instr in code:
+        if _is_label(instr):
+            group.append(instr[:-1])
+            continue
+        if group:
+            for label in group[1:]:
+                alias[label] = group[0]
+            dest = _operand(instr, 'jump')
+            if dest is not None:
+                target[group[0]] = dest
+            group = []
+    for label in group[1:]:
+        alias[label] = group[0]
+
+    def resolve(label):
+        seen = set()
+        label = alias.get(label, label)
+        while label in target and label not in seen:
+            seen.add(label)
+            label = alias.get(target[label], target[label])
+        return label
+
+    result = []
+    for instr in code:
+        for opcode in ('jump', 'jz'):
+            dest = _operand(instr, opcode)
+            if dest is not None:
+                instr = _like(f"{opcode} {resolve(dest)}", instr)
+                break
+        result.append(instr)
+    return result
+
+
+def _remove_dead_code(code):
+    """Remove labels que nenhum salto usa e instruções após `jump`/`stop`/`err` até à label seguinte."""
+    referenced = set()
+    for instr in code:
+        dest = _operand(instr, 'jump') or _operand(instr, 'jz')
+        if dest is not None:
+            referenced.add(dest)
+    result = []
+    reachable = True
+    for instr in code:
+        if _is_label(instr):
+            if instr[:-1] not in referenced:
+                continue
+            reachable = True
+        elif not reachable:
+            continue
+        result.append(instr)
+        if instr == 'stop' or instr.startswith(('jump ', 'err ')):
+            reachable = False
+    return result
+
+
+def _negate_literal(value):
+    return value[1:] if value.startswith('-') else '-' + value
+
+
+def _simplify_tail(out):
+    """Aplica um padrão ao fim de `out`. Devolve True se alterou a lista."""
+    last = out[-1]
+
+    if _is_label(last):
+        # jump/jz L seguido (possivelmente após outras labels) de L:
+        label = last[:-1]
+        i = len(out) - 2
+        while i >= 0 and _is_label(out[i]):
+            i -= 1
+        if i >= 0 and out[i] == f"jump {label}":
+            del out[i]
+            return True
+        # jz L seguido de L: só precisa de descartar a condição
+        if i >= 0 and out[i] == f"jz {label}":
+            out[i] = _like('pop 1', out[i])
+            return True
+        return False
+
+    if len(out) < 2:
+        return False
+    prev = out[-2]
+
+    if prev == 'pushi 0' and last in ('add', 'sub'):
+        del out[-2:]
+        return True
+    # not; not não se pode remover: not converte qualquer inteiro não nulo em 0/1
+    # (a dobragem de constantes trata de `not not x` quando x é booleano)
+    if prev == last == 'neg':
+        del out[-2:]
+        return True
+    if last == 'neg':
+        value = _operand(prev, 'pushi')
+        if value is not None:
+            out[-2:] = [_like(f"pushi {_negate_literal(value)}", prev)]
+            return True
+    if prev == 'neg' and last in ('add', 'sub'):
+        out[-2:] = [_like('sub' if last == 'add' else 'add', last)]
+        return True
+
+    offset = _operand(prev, 'storeg')
+    if offset is not None and last == f"pushg {offset}":
+        out[-2:] = [_like('dup 1', last), prev]
+        return True
+
+    if len(out) < 3:
+        return False
+    if out[-3:-1] == ['pushf -1.0', 'fmul']:
+        if last in ('fadd', 'fsub'):
+            out[-3:] = [_like('fsub' if last == 'fadd' else 'fadd', last)]
+            return True
+    if out[-2:] == ['pushf -1.0', 'fmul']:
+        value = _operand(out[-3], 'pushf')
+        if value is not None:
+            out[-3:] = [_like(f"pushf {_negate_literal(value)}", out[-3])]
+            return True
+        if len(out) >= 4 and out[-4:-2] == ['pushf -1.0', 'fmul']:
+            del out[-4:]
+            return True
+    return False
+
+
+def _window_pass(code):
+    out = []
+    for instr in code:
+        out.append(instr)
+        while out and _simplify_tail(out):
+            pass
+    return out
+
+
+def optimize(code):
+    """Devolve uma nova lista de instruções equivalente a `code`, mais curta."""
+    return _optimize(_split(code))
+
+
+def optimize_with_positions(code, positions):
+    """Como `optimize`, mas devolve também a posição no fonte de cada instrução.
+
+    `positions` tem uma posição por entrada de `code` (CodeGenerator.get_positions()).
+    """
+    optimized = _optimize(_split(code, positions))
+    return [str(instr) for instr in optimized], [getattr(instr, 'position', None) for instr in optimized]
+
+
+def _optimize(code):
+    while True:
+        optimized = _window_pass(_remove_dead_code(_resolve_label_chains(code)))
+        if optimized == code:
+            return optimized
+        code = optimized
@@ -0,0 +1,120 @@
+"""Cache em disco das tabelas do PLY (lextab e tabelas LALR).
+
+As tabelas são guardadas num diretório de cache (`PASCAL_CACHE_DIR`, por
+omissão `__pycache__/ply` ao lado do compilador) com o nome derivado de um hash
+das regras do lexer / das docstrings da gramática e da lista de tokens. Quando
+a gramática muda o hash muda e as tabelas são regeneradas automaticamente.
+Os ficheiros são escritos num nome temporário e renomeados, para que
+processos concorrentes nunca leiam tabelas incompletas.
+"""
+import hashlib
+import importlib.util
+import os
+import tempfile
+
+import ply.lex as lex
+import ply.yacc as yacc
+
+CACHE_DIR = os.environ.get(
+    'PASCAL_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__', 'ply'),
+)
+
+
+def _module_items(module, prefix):
+    return sorted(
+        (name, value) for name, value in vars(module).items()
+        if name.startswith(prefix)
+    )
+
+
+def _digest(parts):
+    sha = hashlib.sha256()
+    sha.update(f"{lex.__version__}|{yacc.__version__}".encode())
+    for part in parts:
+        sha.update(b'\0')
+        sha.update(repr(part).encode('utf-8'))
+    return sha.hexdigest()[:16]
+
+
+def lexer_signature(module):
+    """Hash das regras de tokens (strings e docstrings/regex das funções t_)."""
+    parts = [getattr(module, 'tokens', ()), getattr(module, 'literals', '')]
+    for name, value in _module_items(module, 't_'):
+        if callable(value):
+            parts.append((name, getattr(value, 'regex', None) or value.__doc__))
+        else:
+            parts.append((name, value))
+    return _digest(parts)
+
+
+def grammar_signature(module):
+    """Hash das docstrings das produções, da precedência e dos tokens."""
+    parts = [getattr(module, 'tokens', ()), getattr(module, 'precedence', ()), getattr(module, 'start', None)]
+    for name, value in _module_items(module, 'p_'):
+        if callable(value):
+            parts.append((name, value.__doc__))
+    return _digest(parts)
+
+
+def _ensure_cache_dir():
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        return os.access(CACHE_DIR, os.W_OK)
+    except OSError:
+        return False
+
+
+def _temp_name(prefix):
+    fd, path = tempfile.mkstemp(prefix=prefix, dir=CACHE_DIR)
+    os.close(fd)
+    os.unlink(path)
+    return path
+
+
+def build_lexer(module):
+    """lex.lex(module=module) reutilizando a lextab em cache quando válida."""
+    if not _ensure_cache_dir():
+        return lex.lex(module=module)
+
+    tabname = f"lextab_{lexer_signature(module)}"
+    path = os.path.join(CACHE_DIR, tabname + '.py')
+    if os.path.exists(path):
+        try:
+            spec = importlib.util.spec_from_file_location(tabname, path)
+            lextab = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(lextab)
+            return lex.lex(module=module, optimize=1, lextab=lextab)
+        except Exception:
+            pass  # tabela corrompida ou de outra versão do PLY: regenera
+
+    lexer = lex.lex(module=module)
+    try:
+        tmp_dir = tempfile.mkdtemp(dir=CACHE_DIR)
+        lexer.writetab(tabname, tmp_dir)
+        os.replace(os.path.join(tmp_dir, tabname + '.py'), path)
+        os.rmdir(tmp_dir)
+    except OSError:
+        pass
+    return lexer
+
+
+def build_parser(module, **kwargs):
+    """yacc.yacc(module=module) reutilizando as tabelas LALR em cache."""
+    if not _ensure_cache_dir():
+        return yacc.yacc(module=module, write_tables=False, **kwargs)
+
+    path = os.path.join(CACHE_DIR, f"parsetab_{grammar_signature(module)}.pickle")
+    if os.path.exists(path):
+        try:
+            return yacc.yacc(module=module, picklefile=path, debug=False, **kwargs)
+        except Exception:
+            pass  # pickle incompleto ou corrompido: regenera
+
+    tmp_path = _temp_name('parsetab_')
+    parser = yacc.yacc(module=module, picklefile=tmp_path, outputdir=CACHE_DIR, **kwargs)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return parser
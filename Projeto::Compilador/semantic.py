@@ -0,0 +1,287 @@
+"""Análise semântica: anota o tipo de cada expressão antes da geração de código.
+
+Percorre a AST uma vez, constrói a tabela de tipos a partir das declarações e
+guarda o tipo de cada nó de expressão em `types` (um dicionário nó -> tipo).
+O CodeGenerator consulta esse dicionário em vez de voltar a percorrer cada
+subárvore, o que tornava a inferência quadrática em expressões aninhadas.
+
+Os erros (variáveis não declaradas, arrays desconhecidos, atribuições com
+tipos incompatíveis) são levantados aqui, antes de qualquer instrução ser
+emitida: ValueError para nomes desconhecidos, TypeError para erros de tipos.
+A mensagem indica a linha e a coluna do nó mais interior onde o erro foi
+detetado (quando a AST vem do parser e tem posições).
+
+Os tipos seguem o código que o CodeGenerator emite (ex.: `/` entre inteiros
+gera `div`, por isso é inteiro).
+
+A mesma passagem conta os usos dos literais string/char que o CodeGenerator
+empilha com `_push_constant`, para decidir quais vão para o pool de constantes
+(`pooled_literals`).
+"""
+import ast_nodes as ast
+
+RELATIONAL_OPS = ('=', '<>', '<', '<=', '>', '>=')
+ARITHMETIC_OPS = ('+', '-', '*', '/', 'div', 'mod')
+NUMERIC_TYPES = ('integer', 'real')
+
+FUNCTION_TYPES = {
+    'length': 'integer',
+    'ord': 'integer',
+    'chr': 'char',
+    'odd': 'boolean',
+    'sqrt': 'real',
+}
+# Funções cujo resultado tem o tipo do argumento
+SAME_TYPE_FUNCTIONS = ('abs', 'sqr', 'pred', 'succ')
+
+
+def _locate(error, node):
+    """Acrescenta à mensagem de `error` a posição de `node`, se ainda não tiver uma.
+
+    A posição e a mensagem original ficam também em `error.lineno`,
+    `error.column` e `error.message`, para `file:line:col: message`.
+    """
+    lineno = getattr(node, 'lineno', None)
+    if lineno is not None and getattr(error, 'lineno', None) is None and error.args:
+        error.lineno = lineno
+        error.column = node.column
+        error.message = error.args[0]
+        error.args = (f"{error.args[0]} at line {lineno}, column {node.column}",) + error.args[1:]
+    return error
+
+
+def _declared_type(type_node):
+    return (type_node.name if isinstance(type_node, ast.Type) else str(type_node)).lower()
+
+
+class SemanticAnalyzer:
+    def __init__(self):
+        self.type_info = {}
+        self.array_info = {}
+        self.types = {}
+        # Usos de cada literal empilhado (valor -> nº de usos) e os usados em ciclos
+        self.literal_uses = {}
+        self.loop_literals = set()
+        self.loop_depth = 0
+        # > 0 enquanto se tipam expressões que o CodeGenerator não empilha
+        self.uncounted = 0
+
+    def analyze(self, node):
+        method = getattr(self, f"analyze_{type(node).__name__}", None)
+        if method is not None:
+            try:
+                method(node)
+            except (ValueError, TypeError) as error:
+                raise _locate(error, node)
+
+    def analyze_list(self, node):
+        for item in node:
+            self.analyze(item)
+
+    def analyze_Program(self, node):
+        self.analyze(node.block)
+
+    def analyze_Block(self, node):
+        if node.declarations:
+            self.analyze(node.declarations)
+        if node.compound_statement:
+            self.analyze(node.compound_statement)
+
+    def analyze_VarDeclarations(self, node):
+        self.analyze(node.declarations)
+
+    def analyze_VarDeclaration(self, node):
+        for name in node.names:
+            if isinstance(node.type, ast.ArrayType):
+                element_type = node.type.element_type
+                self.type_info[name] = 'array'
+                self.array_info[name] = _declared_type(element_type) if isinstance(element_type, ast.Type) else 'integer'
+            else:
+                self.type_info[name] = _declared_type(node.type)
+
+    def analyze_Compound(self, node):
+        self.analyze(node.statements)
+
+    def analyze_Assignment(self, node):
+        left_type = self.expression_type(node.left)
+        if isinstance(node.right, ast.String) and not isinstance(node.left, ast.ArrayAccess):
+            # Literal atribuído: emitido com pushs, a variável fica com uma cópia própria
+            right_type = self._uncounted_type(node.right)
+        else:
+            right_type = self.expression_type(node.right)
+        if left_type != right_type:
+            # char := 'c' e real := integer são as únicas conversões implícitas
+            if left_type == 'char' and isinstance(node.right, ast.CharLiteral):
+                pass
+            elif left_type == 'real' and right_type == 'integer':
+                pass
+            else:
+                raise TypeError(f"Incompatible types in assignment: {left_type} := {right_type}")
+
+    def analyze_ProcedureCall(self, node):
+        for arg in node.args:
+            self.expression_type(arg)
+
+    def analyze_ReadlnAssignment(self, node):
+        if node.target is not None:
+            self.expression_type(node.target)
+
+    def analyze_IfStatement(self, node):
+        self._check_condition(node.condition)
+        self.analyze(node.then_part)
+        if node.else_part:
+            self.analyze(node.else_part)
+
+    def analyze_WhileStatement(self, node):
+        self.loop_depth += 1
+        self._check_condition(node.condition)
+        self.analyze(node.body)
+        self.loop_depth -= 1
+
+    def analyze_ForStatement(self, node):
+        var_type = self.type_info.get(node.var_name)
+        if var_type is None:
+            raise ValueError(f"Undeclared variable: {node.var_name}")
+        if var_type != 'integer':
+            raise TypeError(f"For loop variable must be an integer: {node.var_name} is {var_type}")
+        for bound in (node.start_value, node.end_value):
+            bound_type = self.expression_type(bound)
+            if bound_type != 'integer':
+                raise TypeError(f"For loop bounds must be integers, got {bound_type}")
+        # Os limites são avaliados uma só vez, antes do ciclo
+        self.loop_depth += 1
+        self.analyze(node.body)
+        self.loop_depth -= 1
+
+    def _check_condition(self, condition):
+        condition_type = self.expression_type(condition)
+        # Inteiros também são aceites: jz testa apenas se o valor é zero
+        if condition_type not in ('boolean', 'integer'):
+            raise TypeError(f"Condition must be boolean, got {condition_type}")
+
+    def expression_type(self, node):
+        """Tipo de uma expressão; calculado uma vez por nó e guardado em `types`."""
+        node_type = self.types.get(node)
+        if node_type is None:
+            try:
+                node_type = self._compute_type(node)
+            except (ValueError, TypeError) as error:
+                raise _locate(error, node)
+            self.types[node] = node_type
+        return node_type
+
+    def _uncounted_type(self, node):
+        """Tipo de uma expressão que o CodeGenerator não empilha: os literais não contam para o pool."""
+        self.uncounted += 1
+        node_type = self.expression_type(node)
+        self.uncounted -= 1
+        return node_type
+
+    def _count_literal(self, node):
+        if not self.uncounted:
+            self.literal_uses[node.value] = self.literal_uses.get(node.value, 0) + 1
+            if self.loop_depth:
+                self.loop_literals.add(node.value)
+
+    def pooled_literals(self):
+        """Valores dos literais que vão para o pool de constantes, pela ordem do primeiro uso.
+
+        Só compensa guardar num slot global (um `pushs` no arranque) os literais
+        usados mais do que uma vez ou dentro de um ciclo; os restantes continuam a
+        ser um `pushs`.
+        """
+        return [value for value, count in self.literal_uses.items()
+                if count > 1 or value in self.loop_literals]
+
+    def _compute_type(self, node):
+        if isinstance(node, ast.Boolean):
+            return 'boolean'
+        if isinstance(node, ast.Number):
+            return 'real' if isinstance(node.value, float) else 'integer'
+        if isinstance(node, ast.CharLiteral):
+            self._count_literal(node)
+            return 'char'
+        if isinstance(node, ast.String):
+            self._count_literal(node)
+            return 'string'
+        if isinstance(node, ast.Variable):
+            var_type = self.type_info.get(node.name)
+            if var_type is None:
+                if node.name.isdigit():
+                    return 'integer'
+                raise ValueError(f"Undeclared variable: {node.name}")
+            return var_type
+        if isinstance(node, ast.ArrayAccess):
+            array_name = node.array.name
+            index_type = self.expression_type(node.index)
+            if index_type != 'integer':
+                raise TypeError(f"Index of {array_name} must be an integer, got {index_type}")
+            if array_name in self.array_info:
+                return self.array_info[array_name]
+            if self.type_info.get(array_name) == 'string':
+                return 'char'
+            raise ValueError(f"Unknown array/string: {array_name}")
+        if isinstance(node, ast.BinaryOp):
+            return self._binary_type(node)
+        if isinstance(node, ast.UnaryOp):
+            expr_type = self.expression_type(node.expr)
+            if node.op == 'not':
+                if expr_type not in ('boolean', 'integer'):
+                    raise TypeError(f"Operand of not must be boolean, got {expr_type}")
+                return 'boolean'
+            if expr_type not in NUMERIC_TYPES:
+                raise TypeError(f"Operand of unary {node.op} must be numeric, got {expr_type}")
+            return expr_type
+        if isinstance(node, ast.FunctionCall):
+            return self._function_type(node)
+        raise TypeError(f"Not an expression: {node}")
+
+    def _binary_type(self, node):
+        left_type = self._operand_type(node.left, node.right)
+        right_type = self._operand_type(node.right, node.left)
+        if node.op in RELATIONAL_OPS:
+            return 'boolean'
+        if node.op in ('and', 'or'):
+            for operand_type in (left_type, right_type):
+                if operand_type not in ('boolean', 'integer'):
+                    raise TypeError(f"Operands of {node.op} must be boolean, got {operand_type}")
+            return 'boolean'
+        for operand_type in (left_type, right_type):
+            if operand_type not in NUMERIC_TYPES:
+                raise TypeError(f"Operands of {node.op} must be numeric, got {left_type} {node.op} {right_type}")
+        if node.op in ('div', 'mod'):
+            if 'real' in (left_type, right_type):
+                raise TypeError(f"Operands of {node.op} must be integers")
+            return 'integer'
+        return 'real' if 'real' in (left_type, right_type) else 'integer'
+
+    def _operand_type(self, operand, other):
+        # Um char literal operado com s[i] é emitido como pushi ord(c), fora do pool
+        if (isinstance(operand, ast.CharLiteral) and isinstance(other, ast.ArrayAccess)
+                and self.type_info.get(other.array.name) == 'string'):
+            return self._uncounted_type(operand)
+        return self.expression_type(operand)
+
+    def _function_type(self, node):
+        name = node.name.lower()
+        # Só o primeiro argumento é empilhado, e o de length(literal) nem esse
+        arg_types = [self._uncounted_type(arg) if i or name == 'length' and isinstance(arg, ast.String)
+                     else self.expression_type(arg)
+                     for i, arg in enumerate(node.args)]
+        if name == 'length':
+            arg = node.args[0] if node.args else None
+            if not (isinstance(arg, ast.String) or
+                    isinstance(arg, ast.Variable) and arg_types[0] in ('string', 'array')):
+                raise ValueError("Length function can only be applied to strings or arrays")
+        if name in FUNCTION_TYPES:
+            return FUNCTION_TYPES[name]
+        if name in SAME_TYPE_FUNCTIONS:
+            return arg_types[0] if arg_types else 'integer'
+        raise ValueError(f"Unknown function: {node.name}")
+
+
+def analyze(tree):
+    """Analisa a AST e devolve o SemanticAnalyzer com os tipos anotados."""
+    analyzer = SemanticAnalyzer()
+    analyzer.analyze(tree)
+    return analyzer
@@ -0,0 +1,51 @@
+"""Source map do código EWVM: de cada instrução para a linha e coluna do fonte Pascal.
+
+O CodeGenerator (com `source_map=True`) regista a posição de cada entrada que
+emite; `instruction_positions` converte isso numa lista com uma posição por
+instrução EWVM, sem contar as labels — a mesma numeração de `ewvm.load`, dos
+erros de execução da EWVM local e de `stack_analysis`.
+
+O ficheiro (`output.map.json`) é JSON:
+
+    {"version": 1, "source": "prog.pas", "mappings": [[6, 2], [6, 2], null, ...]}
+
+com `[linha, coluna]` (a partir de 1) ou null para instruções sem posição
+(geradas a partir de nós sem correspondência no fonte). A inicialização das
+variáveis fica com a posição da sua declaração.
+"""
+import json
+
+VERSION = 1
+
+
+def instruction_positions(code, positions):
+    """Posição de cada instrução de `code` (entradas do CodeGenerator), sem as labels."""
+    mappings = []
+    for entry, position in zip(code, positions):
+        for line in entry.split('\n'):
+            line = line.strip()
+            if line and not line.endswith(':'):
+                mappings.append(position)
+    return mappings
+
+
+def dump(mappings, stream, source=None):
+    data = {'version': VERSION, 'source': source,
+            'mappings': [list(position) if position is not None else None for position in mappings]}
+    json.dump(data, stream, separators=(',', ':'))
+
+
+def load(stream):
+    """Lê um source map e devolve a lista de posições (tuplos ou None)."""
+    data = json.load(stream)
+    if data.get('version') != VERSION:
+        raise ValueError(f"Unsupported source map version: {data.get('version')}")
+    return [tuple(position) if position is not None else None for position in data['mappings']]
+
+
+def describe(mappings, index):
+    """Texto "line L, column C" da instrução `index`, ou None se não for conhecida."""
+    if index is None or not 0 <= index < len(mappings) or mappings[index] is None:
+        return None
+    lineno, column = mappings[index]
+    return f"line {lineno}, column {column}"
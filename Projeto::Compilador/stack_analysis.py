@@ -0,0 +1,167 @@
+"""Análise estática da profundidade da pilha de operandos do código EWVM.
+
+Segue o fluxo de controlo do programa (saltos, `jz`, labels, `stop` e `err`) com o
+efeito de cada instrução na pilha e calcula a profundidade máxima atingida.
+Assinala os caminhos em que a pilha fica desequilibrada: instruções que
+retiram mais valores do que os existentes, pontos de junção a que se chega
+com profundidades diferentes e saídas do programa com valores por consumir.
+
+Cada instrução é visitada uma vez (a profundidade à entrada de uma instrução
+fica fixada pelo primeiro caminho que lá chega), por isso a análise é linear.
+
+Os valores empilhados antes de `start` são o frame global (as variáveis):
+`start` tira-os da pilha de operandos, e o seu número é indicado à parte.
+
+Uso: python stack_analysis.py <output.txt>
+"""
+import ewvm
+
+# Instrução -> (valores retirados, valores empilhados); dup/pushn/pop dependem do operando
+STACK_EFFECTS = {
+    'pushi': (0, 1), 'pushf': (0, 1), 'pushs': (0, 1), 'pushg': (0, 1), 'storeg': (1, 0), 'pushgp': (0, 1),
+    'swap': (2, 2),
+    'add': (2, 1), 'sub': (2, 1), 'mul': (2, 1), 'div': (2, 1), 'mod': (2, 1), 'neg': (1, 1),
+    'fadd': (2, 1), 'fsub': (2, 1), 'fmul': (2, 1), 'fdiv': (2, 1),
+    'fsqrt': (1, 1), 'itof': (1, 1), 'ftoi': (1, 1),
+    'equal': (2, 1), 'inf': (2, 1), 'infeq': (2, 1), 'sup': (2, 1), 'supeq': (2, 1),
+    'finf': (2, 1), 'finfeq': (2, 1), 'fsup': (2, 1), 'fsupeq': (2, 1),
+    'and': (2, 1), 'or': (2, 1), 'not': (1, 1),
+    'jump': (0, 0), 'jz': (1, 0),
+    'allocn': (1, 1), 'loadn': (2, 1), 'storen': (3, 0),
+    'charat': (2, 1), 'setcharat': (3, 0), 'strlen': (1, 1), 'chr': (1, 1),
+    'read': (0, 1), 'atoi': (1, 1), 'atof': (1, 1),
+    'writei': (1, 0), 'writef': (1, 0), 'writes': (1, 0), 'writechr': (1, 0), 'writeln': (0, 0),
+    'start': (0, 0), 'stop': (0, 0), 'nop': (0, 0), 'err': (0, 0),
+}
+
+
+def stack_effect(name, operand):
+    if name == 'dup':
+        return operand, 2 * operand
+    if name == 'pushn':
+        return 0, operand
+    if name == 'pop':
+        return operand, 0
+    return STACK_EFFECTS[name]
+
+
+class StackProblem:
+    def __init__(self, index, instruction, message):
+        self.index = index
+        self.instruction = instruction
+        self.message = message
+
+    def __str__(self):
+        return f"instruction {self.index} ({self.instruction}): {self.message}"
+
+
+class StackReport:
+    def __init__(self, max_depth, problems, global_slots=0):
+        self.max_depth = max_depth
+        self.problems = problems
+        self.global_slots = global_slots
+
+    @property
+    def balanced(self):
+        return not self.problems
+
+    def format_text(self):
+        lines = [f"max stack depth: {self.max_depth}", f"global frame: {self.global_slots} slot(s)"]
+        if self.problems:
+            lines.append(f"{len(self.problems)} stack problem(s):")
+            lines.extend(f"  {problem}" for problem in self.problems)
+        else:
+            lines.append("stack balanced on every path")
+        return "\n".join(lines)
+
+
+def analyze_stack(code):
+    """Analisa `code` (texto ou lista de instruções do CodeGenerator) e devolve um StackReport."""
+    if not isinstance(code, str):
+        code = "\n".join(code)
+    program = ewvm.load(code)
+    ops, args = program.ops, program.args
+    label_at = {index: name for name, index in program.labels.items()}
+    JUMP, JZ, STOP, ERR, START = ewvm.OP['jump'], ewvm.OP['jz'], ewvm.OP['stop'], ewvm.OP['err'], ewvm.OP['start']
+
+    def describe(index):
+        name = ewvm.OPCODES[ops[index]]
+        operand = args[index]
+        if ops[index] in (JUMP, JZ):
+            operand = label_at.get(operand, operand)
+        return name if operand is None else f"{name} {operand}"
+
+    n_ops = len(ops)
+    depth_at = [None] * n_ops
+    problems = []
+    max_depth = 0
+    global_slots = 0
+    # A profundidade antes de start é o frame global, não conta para o máximo
+    first_start = ops.index(START) if START in ops else -1
+    worklist = [(0, 0)] if n_ops else []
+
+    def reach(target, depth, source):
+        if target >= n_ops:
+            if depth:
+                problems.append(StackProblem(source, describe(source),
+                                             f"program ends with {depth} value(s) left on the stack"))
+            return
+        if depth_at[target] is None:
+            depth_at[target] = depth
+            worklist.append((target, depth))
+        elif depth_at[target] != depth:
+            problems.append(StackProblem(target, describe(target),
+                                         f"reached with stack depth {depth_at[target]} and {depth}"))
+
+    if n_ops:
+        depth_at[0] = 0
+    while worklist:
+        index, depth = worklist.pop()
+        op = ops[index]
+        pops, pushes = stack_effect(ewvm.OPCODES[op], args[index])
+        if depth < pops:
+            problems.append(StackProblem(index, describe(index),
+                                         f"pops {pops} value(s) with stack depth {depth}"))
+            depth = pops
+        depth += pushes - pops
+        if op == START:
+            global_slots = depth
+            depth = 0
+        if index >= first_start:
+            max_depth = max(max_depth, depth)
+        if op == ERR:
+            # Termina com erro: os valores na pilha não contam como desequilíbrio
+            continue
+        if op == STOP:
+            if depth:
+                problems.append(StackProblem(index, describe(index),
+                                             f"program stops with {depth} value(s) left on the stack"))
+        elif op == JUMP:
+            reach(args[index], depth, index)
+        elif op == JZ:
+            reach(args[index], depth, index)
+            reach(index + 1, depth, index)
+        else:
+            reach(index + 1, depth, index)
+    problems.sort(key=lambda problem: problem.index)
+    return StackReport(max_depth, problems, global_slots)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    arg_parser = argparse.ArgumentParser(description="Profundidade máxima da pilha de operandos de código EWVM.")
+    arg_parser.add_argument('filename')
+    args = arg_parser.parse_args()
+    try:
+        with open(args.filename, 'r', encoding='utf-8') as file:
+            report = analyze_stack(file.read())
+    except FileNotFoundError as error:
+        print(f"Error: File '{error.filename}' not found.")
+        sys.exit(1)
+    except ewvm.EWVMError as error:
+        print(f"EWVM error: {error}")
+        sys.exit(1)
+    print(report.format_text())
+    sys.exit(0 if report.balanced else 1)
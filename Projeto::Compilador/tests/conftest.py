@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Os módulos do compilador estão no diretório acima de tests/
+COMPILER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.join(COMPILER_DIR, 'tests')
+sys.path.insert(0, COMPILER_DIR)
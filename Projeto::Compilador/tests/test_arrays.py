@@ -0,0 +1,46 @@
+import ewvm
+from stack_analysis import analyze_stack
+from yacc_pas import parse_source, generate_code
+
+SOURCE = """program A;
+var x: integer; a: array[1..4] of integer; s: string; b: array[0..2] of integer;
+begin
+  x := 3;
+  a[x] := 5;
+  a[1] := a[x] * 2;
+  writeln(a[1], a[2], a[3], a[4], b[x - 1])
+end."""
+
+
+def test_arrays_are_reserved_with_pushn_in_declaration_order():
+    code = generate_code(parse_source(SOURCE))
+    declarations = code.split('start')[0].split()
+    assert declarations == ['pushi', '0', 'pushn', '4', 'pushs', '""', 'pushn', '3']
+
+
+def test_array_elements_start_at_zero():
+    result = ewvm.run(generate_code(parse_source(SOURCE)))
+    assert result.output == "100500\n"
+    assert len(result.globals) == 1 + 4 + 1 + 3
+
+
+def test_global_frame_size_matches_the_declarations():
+    report = analyze_stack(generate_code(parse_source(SOURCE), 1))
+    assert report.balanced
+    assert report.global_slots == 9
+
+
+def test_for_limits_use_slots_reserved_before_start():
+    source = """program F;
+var i, j, n, s: integer;
+begin
+  n := 3; s := 0;
+  for i := 1 to n do
+    for j := i to n + 1 do
+      s := s + j;
+  for i := 1 to n * 2 do s := s + i;
+  writeln(s)
+end."""
+    code = generate_code(parse_source(source))
+    assert code.split('start')[0].split()[-2:] == ['pushn', '2']
+    assert ewvm.run(code).output == "47\n"
@@ -0,0 +1,18 @@
+import ast_nodes as ast
+from profiling import count_nodes_by_class
+from yacc_pas import parse_source
+
+
+def test_iter_nodes_visits_every_node_in_source_order():
+    tree = parse_source("program P;\nvar x: integer;\nbegin\n  x := 1 + 2;\n  writeln(x)\nend.")
+    names = [type(node).__name__ for node in ast.iter_nodes(tree)]
+    assert names[:2] == ['Program', 'Block']
+    statements = names[names.index('Compound'):]
+    assert statements == ['Compound', 'Assignment', 'Variable', 'BinaryOp', 'Number', 'Number',
+                          'ProcedureCall', 'Variable']
+    assert count_nodes_by_class(tree)['Number'] == 2
+
+
+def test_iter_nodes_accepts_lists():
+    nodes = [ast.Number(1), [ast.String('a')]]
+    assert [type(node).__name__ for node in ast.iter_nodes(nodes)] == ['Number', 'String']
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from batch_compile import collect_sources, compile_batch, print_summary
+
+HELLO = "program H;\nbegin\n  writeln('{}')\nend.\n"
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def test_sources_keep_their_path_relative_to_the_given_directory(tmp_path):
+    write(tmp_path / 'src' / 'a' / 'prog.pas', HELLO.format('a'))
+    write(tmp_path / 'src' / 'b' / 'prog.pas', HELLO.format('b'))
+    single = write(tmp_path / 'other' / 'single.pas', HELLO.format('c'))
+    names = [name for _, name in collect_sources([str(tmp_path / 'src'), str(single)])]
+    assert names == [os.path.join('a', 'prog.pas'), os.path.join('b', 'prog.pas'), 'single.pas']
+
+
+def test_same_name_in_subdirectories_does_not_collide(tmp_path):
+    write(tmp_path / 'src' / 'a' / 'prog.pas', HELLO.format('from a'))
+    write(tmp_path / 'src' / 'b' / 'prog.pas', HELLO.format('from b'))
+    out = tmp_path / 'out'
+    results = compile_batch([str(tmp_path / 'src')], str(out), jobs=1, use_cache=False)
+    assert [r.error for r in results] == [None, None]
+    assert 'from a' in (out / 'a' / 'prog.txt').read_text(encoding='utf-8')
+    assert 'from b' in (out / 'b' / 'prog.txt').read_text(encoding='utf-8')
+
+
+def test_duplicate_output_names_are_rejected_before_writing(tmp_path):
+    first = write(tmp_path / 'a' / 'prog.pas', HELLO.format('a'))
+    second = write(tmp_path / 'b' / 'prog.pas', HELLO.format('b'))
+    out = tmp_path / 'out'
+    with pytest.raises(ValueError, match="prog"):
+        compile_batch([str(first), str(second)], str(out), use_cache=False)
+    assert not out.exists()
+
+
+def test_summary_lists_only_the_files_written(tmp_path, capsys):
+    write(tmp_path / 'src' / 'prog.pas', HELLO.format('x'))
+    out = tmp_path / 'out'
+    results = compile_batch([str(tmp_path / 'src')], str(out), emit={'dot'}, use_cache=False)
+    assert results[0].output is None
+    assert results[0].artifacts == [str(out / 'prog.dot')]
+    print_summary(results)
+    printed = capsys.readouterr().out
+    assert f"-> {out / 'prog.dot'}" in printed
+    assert '.txt' not in printed
+    assert not (out / 'prog.txt').exists()
+
+
+def test_binary_output_is_reported_with_the_code(tmp_path):
+    write(tmp_path / 'src' / 'prog.pas', HELLO.format('x'))
+    out = tmp_path / 'out'
+    results = compile_batch([str(tmp_path / 'src')], str(out), emit={'code', 'bin'}, use_cache=False)
+    assert results[0].artifacts == [str(out / 'prog.txt'), str(out / 'prog.ewvb')]
+    assert all(os.path.exists(path) for path in results[0].artifacts)
+
+
+def test_a_failing_source_does_not_stop_the_others(tmp_path):
+    write(tmp_path / 'src' / 'bad.pas', "program B;\nbegin\n  y := 1\nend.\n")
+    write(tmp_path / 'src' / 'good.pas', HELLO.format('ok'))
+    results = compile_batch([str(tmp_path / 'src')], str(tmp_path / 'out'), jobs=2, use_cache=False)
+    errors = {os.path.basename(r.source): r.error for r in results}
+    assert errors['good.pas'] is None
+    assert errors['bad.pas'].startswith("ValueError: Undeclared variable: y")
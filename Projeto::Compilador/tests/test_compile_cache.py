@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+
+import compile_cache
+from compile_cache import CompileCache
+from conftest import COMPILER_DIR
+
+
+def test_key_depends_on_source_and_options(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    keys = {
+        cache.key("program A; begin end."),
+        cache.key("program B; begin end."),
+        cache.key("program A; begin end.", opt_level=1),
+        cache.key("program A; begin end.", range_checks=True),
+    }
+    assert len(keys) == 4
+    assert cache.key("program A; begin end.") == cache.key("program A; begin end.")
+
+
+def test_compiler_change_invalidates_entries(tmp_path, monkeypatch):
+    cache = CompileCache(str(tmp_path))
+    key = cache.key("program A; begin end.")
+    cache.put(key, code="start\nstop")
+    monkeypatch.setattr(compile_cache, '_compiler_version', 'another compiler')
+    new_key = cache.key("program A; begin end.")
+    assert new_key != key
+    assert cache.get(new_key) is None
+
+
+def test_put_and_get(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    cache.put('k', code="start\nstop", ast_text="Program: A")
+    entry = cache.get('k', need_ast=True)
+    assert entry.code == "start\nstop"
+    assert entry.ast_text == "Program: A"
+    cache.put('c', code="start\nstop")
+    assert cache.get('c') is not None
+    assert cache.get('c', need_ast=True) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = CompileCache(str(tmp_path), max_bytes=250)
+    for index, key in enumerate(('old', 'used', 'new')):
+        cache.put(key, code='x' * 100)
+        os.utime(os.path.join(str(tmp_path), key + '.ewvm'), (1000 + index, 1000 + index))
+    cache.get('used')
+    cache.put('newest', code='x' * 100)
+    # 'new' é mais recente do que 'used' pelo mtime, mas 'used' foi lido depois
+    assert cache.get('old') is None
+    assert cache.get('new') is None
+    assert cache.get('used') is not None
+    assert cache.get('newest') is not None
+
+
+def test_entry_survives_eviction_by_another_process(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    cache.put('k', code="start\nstop")
+    entry = cache.get('k')
+    os.unlink(os.path.join(str(tmp_path), 'k.ewvm'))
+    assert entry.code == "start\nstop"
+    assert cache.get('k') is None
+
+
+def test_cli_reuses_cached_code(tmp_path):
+    source = tmp_path / 'prog.pas'
+    source.write_text("program P;\nbegin\n  writeln(1)\nend.", encoding='utf-8')
+    env = dict(os.environ, PASCAL_COMPILE_CACHE_DIR=str(tmp_path / 'cache'))
+    outputs = []
+    for _ in range(2):
+        completed = subprocess.run([sys.executable, os.path.join(COMPILER_DIR, 'yacc_pas.py'), str(source)],
+                                   cwd=tmp_path, env=env, capture_output=True, text=True)
+        assert completed.returncode == 0
+        outputs.append((tmp_path / 'output.txt').read_text(encoding='utf-8'))
+    assert "(from compile cache)" in completed.stdout
+    assert outputs[0] == outputs[1]
+
+
+def test_cli_reports_a_missing_source(tmp_path):
+    completed = subprocess.run([sys.executable, os.path.join(COMPILER_DIR, 'yacc_pas.py'), 'missing.pas'],
+                               cwd=tmp_path, capture_output=True, text=True)
+    assert completed.returncode == 1
+    assert "Error: File 'missing.pas' not found." in completed.stdout
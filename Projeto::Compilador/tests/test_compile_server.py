@@ -0,0 +1,53 @@
+import io
+import json
+
+import compile_server
+
+PROGRAM = "program P;\nbegin\n  writeln(1)\nend."
+
+
+def serve(*requests):
+    lines = [line if isinstance(line, str) else json.dumps(line) for line in requests]
+    output = io.StringIO()
+    compile_server.serve_stream(io.StringIO("\n".join(lines) + "\n"), output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_compiles_a_request():
+    [response] = serve({'id': 1, 'source': PROGRAM, 'opt_level': 1})
+    assert response['id'] == 1 and response['ok']
+    assert 'writei' in response['code']
+    assert response['diagnostics'] == []
+
+
+def test_compile_errors_are_diagnostics():
+    [syntax, semantic] = serve({'id': 1, 'source': "program P; begin x := end."},
+                               {'id': 2, 'source': "program P;\nbegin\n  y := 1\nend."})
+    assert not syntax['ok'] and syntax['code'] is None
+    assert any('Syntax error' in line for line in syntax['diagnostics'])
+    assert not semantic['ok']
+    assert semantic['diagnostics'] == ["ValueError: Undeclared variable: y at line 3, column 3"]
+
+
+def test_invalid_requests_are_answered():
+    responses = serve("not json", {'id': 3, 'source': 42})
+    assert [r['ok'] for r in responses] == [False, False]
+    assert responses[1]['id'] == 3
+
+
+def test_unexpected_exceptions_do_not_stop_the_server(monkeypatch):
+    def broken(*args):
+        raise AttributeError("codegen bug")
+
+    monkeypatch.setattr(compile_server, 'generate_code', broken)
+    failed = compile_server.handle_request({'id': 1, 'source': PROGRAM})
+    assert not failed['ok']
+    assert failed['error'] == "AttributeError: codegen bug"
+    monkeypatch.undo()
+    assert compile_server.handle_request({'id': 2, 'source': PROGRAM})['ok']
+
+
+def test_no_state_leaks_between_requests():
+    first, second = serve({'id': 1, 'source': "program A;\nvar x: integer;\nbegin\n  x := 1\nend."},
+                          {'id': 2, 'source': "program B;\nbegin\n  x := 1\nend."})
+    assert first['ok'] and not second['ok']
@@ -0,0 +1,39 @@
+import pytest
+
+import ast_nodes as ast
+from constant_folding import fold_constants, constant_value
+from yacc_pas import parse_source
+
+
+def folded_expression(expression, declarations="x, y: integer; a: array[1..3] of integer"):
+    tree = fold_constants(parse_source(f"program P;\nvar {declarations};\nbegin\n  x := {expression}\nend."))
+    return tree.block.compound_statement.statements[0].right
+
+
+@pytest.mark.parametrize('expression, value', [
+    ("2 * 3 + 4", 10),
+    ("-7 div 2", -3),
+    ("-7 mod 2", -1),
+    ("sqr(x) * 0", 0),
+    ("(x + 1) * 0", 0),
+    ("x div 2 * 0", 0),
+])
+def test_folds_to_a_number(expression, value):
+    result = folded_expression(expression)
+    assert isinstance(result, ast.Number) and result.value == value
+
+
+@pytest.mark.parametrize('expression', [
+    "(x div y) * 0",
+    "(x mod y) * 0",
+    "a[x] * 0",
+    "1 div 0",
+])
+def test_keeps_expressions_that_may_fail(expression):
+    assert not isinstance(folded_expression(expression), ast.Number)
+
+
+def test_constant_value_of_array_bounds():
+    assert constant_value(ast.BinaryOp(ast.Number(2), '*', ast.Number(3))) == 6
+    with pytest.raises(ValueError):
+        constant_value(ast.Variable('n'))
@@ -0,0 +1,66 @@
+import pytest
+
+import ewvm
+
+
+def run(text, **kwargs):
+    return ewvm.run(text, **kwargs)
+
+
+def test_globals_are_the_values_pushed_before_start():
+    result = run("pushi 7\npushn 2\npushs \"ab\"\nstart\npushg 0\nwritei\npushg 3\nwrites\nstop")
+    assert result.output == "7ab"
+    assert result.globals == [7, 0, 0, list("ab")]
+    assert result.stack == []
+
+
+def test_pushg_outside_the_global_frame_fails():
+    with pytest.raises(ewvm.EWVMError) as info:
+        run("pushi 0\nstart\npushg 1\nstop")
+    assert info.value.instruction == 2
+
+
+def test_pop_zero_keeps_the_stack():
+    result = run("pushi 1\npushi 2\npop 0\nwritei\nwritei")
+    assert result.output == "21"
+
+
+def test_dup_zero_keeps_the_stack():
+    assert run("pushi 1\ndup 0\nwritei").stack == []
+
+
+def test_pop_more_than_the_stack_fails():
+    with pytest.raises(ewvm.EWVMError) as info:
+        run("pushi 1\npop 2")
+    assert info.value.instruction == 1
+
+
+@pytest.mark.parametrize('op', ['atoi', 'atof'])
+def test_invalid_numeric_input_fails(op):
+    with pytest.raises(ewvm.EWVMError) as info:
+        run(f"read\n{op}\nwritei", inputs=["abc"])
+    assert info.value.instruction == 1
+
+
+@pytest.mark.parametrize('text, instruction', [
+    ("pushi 0\nstart\npushg -1", 2),
+    ("pushi 0\nstart\npushi 1\nstoreg -1", 3),
+    ("pushi 0\nstart\npushgp\npushi -1\nloadn", 4),
+    ("pushi 0\nstart\npushgp\npushi -1\npushi 5\nstoren", 5),
+    ("pushs \"ab\"\npushi -1\ncharat", 2),
+])
+def test_negative_addresses_fail(text, instruction):
+    with pytest.raises(ewvm.EWVMError) as info:
+        run(text)
+    assert info.value.instruction == instruction
+
+
+def test_err_reports_its_instruction():
+    with pytest.raises(ewvm.EWVMError, match="boom") as info:
+        run("start\nnop\nerr \"boom\"\nstop")
+    assert info.value.instruction == 2
+
+
+def test_truncating_division_and_mod():
+    result = run("pushi -7\npushi 2\ndiv\nwritei\npushi -7\npushi 2\nmod\nwritei")
+    assert result.output == "-3-1"
@@ -0,0 +1,71 @@
+import glob
+import os
+
+import pytest
+
+import ewvm
+import ewvm_binary
+from conftest import TESTS_DIR
+from yacc_pas import parse_source, generate_code
+
+SOURCES = sorted(glob.glob(os.path.join(TESTS_DIR, '*.pas')))
+INPUTS = ['5', '3', '7', '2', '9'] * 20
+
+
+def compile_file(path, opt_level, range_checks=False):
+    with open(path, 'r', encoding='utf-8') as file:
+        return generate_code(parse_source(file.read(), opt_level), opt_level, range_checks)
+
+
+@pytest.mark.parametrize('opt_level', [0, 1])
+@pytest.mark.parametrize('path', SOURCES, ids=os.path.basename)
+def test_decode_inverts_encode(path, opt_level):
+    code = compile_file(path, opt_level, range_checks=True)
+    assert ewvm_binary.decode(ewvm_binary.encode(code)) == code
+
+
+@pytest.mark.parametrize('opt_level', [0, 1])
+@pytest.mark.parametrize('path', SOURCES, ids=os.path.basename)
+def test_load_binary_matches_load(path, opt_level):
+    code = compile_file(path, opt_level)
+    text_program = ewvm.load(code)
+    binary_program = ewvm_binary.load_binary(ewvm_binary.encode(code))
+    assert list(binary_program.ops) == list(text_program.ops)
+    # Sem operando: None no texto, 0 no formato binário
+    assert [arg if expected is not None else None
+            for arg, expected in zip(binary_program.args, text_program.args)] == text_program.args
+    assert binary_program.labels == text_program.labels
+    expected = ewvm.run(text_program, inputs=INPUTS)
+    result = ewvm.run(binary_program, inputs=INPUTS)
+    assert (result.output, result.instructions) == (expected.output, expected.instructions)
+
+
+def test_aliased_labels_and_constants_round_trip():
+    code = "\n".join([
+        'pushi -300', 'pushf 2.5', 'pushs "a \\"quoted\\" string"', 'start',
+        'jump ENDIF3', 'nop', 'ENDIF3:', 'ENDWHILE2:', 'pushi 1', 'jz ENDWHILE2', 'err "x"', 'stop',
+    ])
+    assert ewvm_binary.decode(ewvm_binary.encode(code)) == code
+
+
+def test_operand_width_grows_with_the_operands():
+    # O byte 5 do cabeçalho é a largura dos operandos
+    assert ewvm_binary.encode("pushi 100")[5] == 1
+    large = ewvm_binary.encode("pushi 100000")
+    assert large[5] == 4
+    assert ewvm_binary.load_binary(large).args == [100000]
+
+
+@pytest.mark.parametrize('data, message', [
+    (b'EWV', 'too short'),
+    (b'XXXX' + bytes(ewvm_binary.HEADER.size), 'bad magic'),
+])
+def test_invalid_binary_is_rejected(data, message):
+    with pytest.raises(ewvm.EWVMError, match=message):
+        ewvm_binary.load_binary(data)
+
+
+def test_truncated_binary_is_rejected():
+    data = ewvm_binary.encode('pushs "hello"\nwrites')
+    with pytest.raises(ewvm.EWVMError):
+        ewvm_binary.load_binary(data[:-3])
@@ -0,0 +1,74 @@
+import glob
+import os
+
+import pytest
+
+import ewvm
+from conftest import TESTS_DIR
+from yacc_pas import parse_source, generate_code
+
+SOURCES = sorted(glob.glob(os.path.join(TESTS_DIR, '*.pas')))
+INPUTS = ['5', '3', '7', '2', '9', '1', '4', '6', '8', '10'] * 10
+
+# Casos que exercitam a dobragem, a remoção de invariantes e a eliminação de subexpressões
+PROGRAMS = {
+    'fold': """program F;
+var x: integer; r: real;
+begin
+  x := 2 * 3 + 4 div 2 - 7 mod 3;
+  r := 1.5 * 2;
+  if 1 < 2 then writeln(x) else writeln(0);
+  while false do x := x + 1;
+  writeln(x * 1 + 0, ' ', sqr(x) * 0, ' ', r)
+end.""",
+    'loops': """program L;
+var i, j, n, s: integer; a: array[1..10] of integer;
+begin
+  n := 4; s := 0;
+  for i := 1 to n * 2 do a[i] := i * (n + 1);
+  for i := 1 to n do
+    for j := i to n + 1 do
+      s := s + a[i + 1] + a[i + 1] * j;
+  i := 10;
+  while i > 0 do begin s := s - (n + 1); i := i - 3 end;
+  writeln(s)
+end.""",
+}
+
+
+def run(source, opt_level, range_checks=False):
+    code = generate_code(parse_source(source, opt_level), opt_level, range_checks)
+    result = ewvm.run(code, inputs=INPUTS, max_steps=10 ** 6)
+    return result.output, result.instructions
+
+
+@pytest.mark.parametrize('range_checks', [False, True])
+@pytest.mark.parametrize('path', SOURCES, ids=os.path.basename)
+def test_optimized_code_has_the_same_output(path, range_checks):
+    with open(path, 'r', encoding='utf-8') as file:
+        source = file.read()
+    # Só a saída: uma expressão retirada de um ciclo que corre uma ou duas vezes pode
+    # custar mais instruções do que as que poupa
+    assert run(source, 1, range_checks)[0] == run(source, 0, range_checks)[0]
+
+
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_optimized_programs_have_the_same_output(name):
+    output, instructions = run(PROGRAMS[name], 0)
+    optimized_output, optimized_instructions = run(PROGRAMS[name], 1)
+    assert optimized_output == output
+    assert optimized_instructions < instructions
+
+
+def test_double_not_of_an_integer_is_normalized():
+    # not converte qualquer inteiro não nulo em 0/1: not not i não é i
+    source = """program P;
+var i: integer; b: boolean;
+begin
+  i := 5;
+  b := not not i;
+  writeln(b);
+  writeln(not not i)
+end."""
+    assert run(source, 0)[0] == "1\n1\n"
+    assert run(source, 1)[0] == "1\n1\n"
@@ -0,0 +1,26 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import COMPILER_DIR, TESTS_DIR
+from profiling import profile_compile
+
+
+def test_profile_counts_phases(tmp_path):
+    with open(os.path.join(TESTS_DIR, 'exemplo5_soma_array.pas'), 'r', encoding='utf-8') as file:
+        data = file.read()
+    profiler = profile_compile(data, opt_level=1, output_path=str(tmp_path / 'output.txt'))
+    report = json.loads(profiler.format_json())
+    assert report['counts']['instructions'] > 0
+    assert {'lex', 'parse', 'fold', 'codegen', 'peephole'} <= {phase['phase'] for phase in report['phases']}
+
+
+def test_profile_flag_keeps_the_other_outputs(tmp_path):
+    command = [sys.executable, os.path.join(COMPILER_DIR, 'yacc_pas.py'), '--profile', '--profile-format', 'json',
+               '--profile-output', 'profile.json', os.path.join(TESTS_DIR, 'exemplo1_hello.pas'), '--emit', 'bin']
+    completed = subprocess.run(command, cwd=tmp_path, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+    assert json.loads((tmp_path / 'profile.json').read_text(encoding='utf-8'))['counts']['tokens'] > 0
+    assert (tmp_path / 'output.txt').exists()
+    assert (tmp_path / 'output.ewvb').exists()
@@ -0,0 +1,47 @@
+import pytest
+
+import ewvm
+from yacc_pas import parse_source, generate_code
+
+PROGRAM = """program R;
+var i, n: integer; a: array[2..5] of integer; b: array[1..3] of integer;
+begin
+  n := {n};
+  for i := 2 to 5 do a[i] := i;
+  b[1] := 7;
+  a[n] := 1;
+  writeln(a[n], b[1])
+end."""
+
+
+def compile_program(n, opt_level=0, range_checks=True):
+    return generate_code(parse_source(PROGRAM.format(n=n), opt_level), opt_level, range_checks)
+
+
+@pytest.mark.parametrize('opt_level', [0, 1])
+@pytest.mark.parametrize('n', [1, 6])
+def test_out_of_range_index_stops_with_an_error(n, opt_level):
+    with pytest.raises(ewvm.EWVMError, match="Index out of range for array a"):
+        ewvm.run(compile_program(n, opt_level))
+
+
+@pytest.mark.parametrize('opt_level', [0, 1])
+@pytest.mark.parametrize('n', [2, 5])
+def test_in_range_index_runs(n, opt_level):
+    assert ewvm.run(compile_program(n, opt_level)).output == "17\n"
+
+
+def test_checks_are_opt_in():
+    assert 'RANGEERR' not in compile_program(6, range_checks=False)
+
+
+def test_provably_valid_indices_are_not_checked():
+    source = """program V;
+var i: integer; a: array[1..4] of integer;
+begin
+  a[4] := 1;
+  for i := 1 to 4 do a[i] := i;
+  for i := 1 to 3 do a[i + 1] := a[i]
+end."""
+    code = generate_code(parse_source(source), 0, True)
+    assert 'RANGEERR' not in code
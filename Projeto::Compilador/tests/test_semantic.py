@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import semantic
+from conftest import COMPILER_DIR
+from yacc_pas import parse_source, generate_code
+
+
+def analyze(source):
+    return semantic.analyze(parse_source(source))
+
+
+@pytest.mark.parametrize('source, error, message, lineno, column', [
+    ("program P;\nvar x: integer;\nbegin\n  x := 1 + true\nend.",
+     TypeError, "Operands of + must be numeric, got integer + boolean", 4, 8),
+    ("program P;\nbegin\n  y := 1\nend.",
+     ValueError, "Undeclared variable: y", 3, 3),
+    ("program P;\nvar s: string;\nbegin\n  s := 1\nend.",
+     TypeError, "Incompatible types in assignment: string := integer", 4, 3),
+])
+def test_errors_carry_their_position(source, error, message, lineno, column):
+    with pytest.raises(error) as info:
+        analyze(source)
+    assert (info.value.message, info.value.lineno, info.value.column) == (message, lineno, column)
+    assert str(info.value) == f"{message} at line {lineno}, column {column}"
+
+
+def test_errors_are_raised_before_any_code_is_emitted():
+    with pytest.raises(TypeError):
+        generate_code(parse_source("program P;\nvar x: integer;\nbegin\n  writeln(1);\n  x := 1.5\nend."))
+
+
+def test_expression_types_are_annotated():
+    tree = parse_source("program P;\nvar x: integer; r: real;\nbegin\n  r := x / 2 + 1.0\nend.")
+    analyzer = semantic.analyze(tree)
+    expression = tree.block.compound_statement.statements[0].right
+    assert analyzer.types[expression] == 'real'
+    assert analyzer.types[expression.left] == 'integer'
+
+
+def test_command_line_reports_file_line_and_column(tmp_path):
+    source = tmp_path / 'bad.pas'
+    source.write_text("program P;\nvar x: integer;\nbegin\n  x := 1 + true\nend.\n", encoding='utf-8')
+    completed = subprocess.run([sys.executable, os.path.join(COMPILER_DIR, 'yacc_pas.py'), str(source)],
+                               cwd=tmp_path, capture_output=True, text=True)
+    assert completed.returncode == 1
+    assert f"{source}:4:8: Operands of + must be numeric, got integer + boolean" in completed.stdout.splitlines()
+    assert 'Traceback' not in completed.stderr
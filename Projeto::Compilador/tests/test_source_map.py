@@ -0,0 +1,46 @@
+import io
+
+import pytest
+
+import ewvm
+import source_map
+from yacc_pas import parse_source, generate_mapped_code
+
+SOURCE = """program M;
+var i: integer; a: array[1..3] of integer;
+begin
+  i := 2;
+  writeln(i);
+  i := i + 2;
+  a[i] := 1
+end."""
+
+
+@pytest.mark.parametrize('opt_level', [0, 1])
+def test_one_position_per_instruction(opt_level):
+    code, mappings = generate_mapped_code(parse_source(SOURCE, opt_level), opt_level, True)
+    assert len(mappings) == len(ewvm.load(code))
+
+
+@pytest.mark.parametrize('opt_level', [0, 1])
+def test_runtime_error_maps_to_its_source_line(opt_level):
+    code, mappings = generate_mapped_code(parse_source(SOURCE, opt_level), opt_level, True)
+    with pytest.raises(ewvm.EWVMError) as info:
+        ewvm.run(code)
+    assert source_map.describe(mappings, info.value.instruction) == "line 7, column 3"
+
+
+def test_declarations_map_to_their_declaration():
+    code, mappings = generate_mapped_code(parse_source(SOURCE))
+    start = ewvm.load(code).ops.index(ewvm.OP['start'])
+    assert [lineno for lineno, _ in mappings[:start]] == [2, 2]
+    assert mappings[start + 1] == (4, 8)  # pushi 2
+
+
+def test_dump_and_load_round_trip():
+    _, mappings = generate_mapped_code(parse_source(SOURCE))
+    stream = io.StringIO()
+    source_map.dump(mappings, stream, source='m.pas')
+    stream.seek(0)
+    assert source_map.load(stream) == mappings
+    assert source_map.describe(mappings, len(mappings)) is None
@@ -0,0 +1,63 @@
+import glob
+import os
+
+import pytest
+
+import ewvm
+from conftest import TESTS_DIR
+from pascal_codegen import CodeGenerator
+from yacc_pas import parse_source
+
+SOURCES = sorted(glob.glob(os.path.join(TESTS_DIR, '*.pas')))
+
+# Literais em vários contextos: comparados com s[i] (pushi ord), atribuídos, em
+# length, usados uma só vez, repetidos e dentro de ciclos
+SOURCE = """program P;
+var s: string; c: char; i, n: integer;
+begin
+  s := 'abc';
+  c := 'x';
+  n := length('hello');
+  for i := 1 to 3 do
+  begin
+    if s[i] = 'b' then writeln('found');
+    if 'c' = s[i] then writeln('found');
+    write('-')
+  end;
+  writeln(s, ' ', c, ' ', n, ' ')
+end."""
+
+
+def generate(source, opt_level=0):
+    generator = CodeGenerator()
+    generator.generate(parse_source(source, opt_level))
+    return generator
+
+
+def read_slots(code):
+    return {int(line.split()[1]) for line in code[code.index('start'):] if line.startswith('pushg ')}
+
+
+@pytest.mark.parametrize('opt_level', [0, 1])
+@pytest.mark.parametrize('path', SOURCES + [None], ids=lambda path: os.path.basename(path) if path else 'literals')
+def test_every_pooled_slot_is_read(path, opt_level):
+    if path is None:
+        source = SOURCE
+    else:
+        with open(path, 'r', encoding='utf-8') as file:
+            source = file.read()
+    generator = generate(source, opt_level)
+    assert set(generator.string_constants.values()) <= read_slots(generator.code)
+
+
+def test_only_pushed_literals_are_pooled():
+    generator = generate(SOURCE)
+    # 'b' e 'c' são comparados com s[i] como pushi, 'abc' é atribuído, 'hello' vai para
+    # length e 'x' é usado uma só vez fora dos ciclos
+    assert list(generator.string_constants) == ['found', '-', ' ']
+
+
+def test_pooled_program_runs():
+    generator = generate(SOURCE)
+    result = ewvm.run("\n".join(generator.code))
+    assert result.output == "-found\n-found\n-abc x 5 \n"
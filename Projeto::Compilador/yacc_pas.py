@@ -1,31 +1,50 @@
-import ply.yacc as yacc
+import sys
+
 from lex_pas import tokens, lexer
 import ast_nodes as ast
-from pascal_codegen import CodeGenerator
+from pascal_codegen import CodeGenerator, FileSink
+from ply_cache import build_parser
+from constant_folding import fold_constants
+from loop_invariants import hoist_invariants
+from cse import eliminate_common_subexpressions
+from peephole import optimize, optimize_with_positions
+from source_map import instruction_positions
 
 precedence = (
     ('left', 'kTHEN'),
     ('left', 'kELSE'),
 )
+
+def _at(node, p, n):
+    """Regista em `node` a linha e a coluna do token p[n]."""
+    token = p.slice[n]
+    node.lineno = token.lineno
+    data = getattr(p.lexer, 'lexdata', None)
+    if data is not None:
+        node.column = token.lexpos - data.rfind('\n', 0, token.lexpos)
+    return node
+
 def p_program(p):
     'program : kPROGRAM yNAME oSEMI program_block oDOT'
-    p[0] = ast.Program(name=p[2], block=p[4])
+    p[0] = _at(ast.Program(name=p[2], block=p[4]), p, 1)
 
 def p_program_block(p):
     'program_block : declarations compound_statement'
-    p[0] = ast.Block(declarations=p[1], compound_statement=p[2])
+    p[0] = ast.copy_position(ast.Block(declarations=p[1], compound_statement=p[2]), p[2])
 
 def p_declarations(p):
-    '''declarations : var_declaration declarations
+    '''declarations : declarations var_declaration
                    | empty'''
+    # Recursiva à esquerda: a pilha do parser não cresce com o nº de secções var
     if len(p) == 3:
-        p[0] = [p[1]] + p[2]
+        p[1].append(p[2])
+        p[0] = p[1]
     else:
         p[0] = []
 
 def p_var_declaration(p):
     'var_declaration : kVAR var_declaration_list oSEMI'
-    p[0] = ast.VarDeclarations(declarations=p[2])
+    p[0] = _at(ast.VarDeclarations(declarations=p[2]), p, 1)
 
 def p_var_declaration_list(p):
     '''var_declaration_list : var_declaration_item
@@ -33,11 +52,12 @@ def p_var_declaration_list(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_var_declaration_item(p):
     'var_declaration_item : name_list oCOLON type_spec'
-    p[0] = ast.VarDeclaration(names=p[1], type=p[3])
+    p[0] = _at(ast.VarDeclaration(names=p[1], type=p[3]), p, 2)
 
 def p_name_list(p):
     '''name_list : yNAME
@@ -45,7 +65,8 @@ def p_name_list(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_type_spec(p):
     '''type_spec : SYS_TYPE
@@ -55,15 +76,15 @@ def p_type_spec(p):
 
 def p_array_type(p):
     'array_type : kARRAY oLB index_range oRB kOF type_spec'
-    p[0] = ast.ArrayType(index_range=p[3], element_type=p[6])
+    p[0] = _at(ast.ArrayType(index_range=p[3], element_type=p[6]), p, 1)
 
 def p_index_range(p):
     'index_range : expression oDOTDOT expression'
-    p[0] = ast.IndexRange(lower=p[1], upper=p[3])
+    p[0] = ast.copy_position(ast.IndexRange(lower=p[1], upper=p[3]), p[1])
 
 def p_compound_statement(p):
     'compound_statement : kBEGIN statement_list kEND'
-    p[0] = ast.Compound(statements=p[2])
+    p[0] = _at(ast.Compound(statements=p[2]), p, 1)
 
 def p_statement_list(p):
     '''statement_list : statement
@@ -71,7 +92,8 @@ def p_statement_list(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_statement(p):
     '''statement : if_statement
@@ -90,6 +112,7 @@ def p_if_statement(p):
         p[0] = ast.IfStatement(condition=p[2], then_part=p[4], else_part=None)
     else:
         p[0] = ast.IfStatement(condition=p[2], then_part=p[4], else_part=p[5])
+    _at(p[0], p, 1)
 
 def p_else_part(p):
     '''else_part : kELSE statement'''
@@ -97,7 +120,7 @@ def p_else_part(p):
 
 def p_assignment_statement(p):
     'assignment_statement : lvalue oASSIGN expression'
-    p[0] = ast.Assignment(left=p[1], right=p[3])
+    p[0] = ast.copy_position(ast.Assignment(left=p[1], right=p[3]), p[1])
 
 def p_procedure_call(p):
     '''procedure_call : yNAME
@@ -113,7 +136,7 @@ def p_procedure_call(p):
             if len(p[3]) == 1:
                 p[0] = ast.ReadlnAssignment(target=p[3][0])
             else:
-                assignments = [ast.ReadlnAssignment(target=arg) for arg in p[3]]
+                assignments = [_at(ast.ReadlnAssignment(target=arg), p, 1) for arg in p[3]]
                 p[0] = ast.Compound(statements=assignments)
         else:
             p[0] = ast.ProcedureCall(name=p[1], args=p[3])
@@ -122,6 +145,7 @@ def p_procedure_call(p):
             p[0] = ast.ReadlnAssignment(target=None)
         else:
             p[0] = ast.ProcedureCall(name=p[1], args=[])
+    _at(p[0], p, 1)
 
 def p_argument_list(p):
     '''argument_list : expression
@@ -129,15 +153,16 @@ def p_argument_list(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_while_statement(p):
     'while_statement : kWHILE expression kDO statement'
-    p[0] = ast.WhileStatement(condition=p[2], body=p[4])
+    p[0] = _at(ast.WhileStatement(condition=p[2], body=p[4]), p, 1)
 
 def p_for_statement(p):
     'for_statement : kFOR yNAME oASSIGN expression direction expression kDO statement'
-    p[0] = ast.ForStatement(var_name=p[2], start_value=p[4], end_value=p[6], body=p[8], direction=p[5])
+    p[0] = _at(ast.ForStatement(var_name=p[2], start_value=p[4], end_value=p[6], body=p[8], direction=p[5]), p, 1)
 
 def p_direction(p):
     '''direction : kTO
@@ -150,7 +175,7 @@ def p_expression(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = ast.BinaryOp(left=p[1], op=p[2], right=p[3])
+        p[0] = ast.copy_position(ast.BinaryOp(left=p[1], op=p[2], right=p[3]), p[1])
 
 def p_relop(p):
     '''relop : oEQUAL
@@ -168,9 +193,9 @@ def p_simple_expression(p):
     if len(p) == 2:
         p[0] = p[1]
     elif len(p) == 3:
-        p[0] = ast.UnaryOp(op=p[1], expr=p[2])
+        p[0] = ast.copy_position(ast.UnaryOp(op=p[1], expr=p[2]), p[2])
     else:
-        p[0] = ast.BinaryOp(left=p[1], op=p[2], right=p[3])
+        p[0] = ast.copy_position(ast.BinaryOp(left=p[1], op=p[2], right=p[3]), p[1])
 
 def p_sign(p):
     '''sign : oPLUS
@@ -189,7 +214,7 @@ def p_term(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = ast.BinaryOp(left=p[1], op=p[2], right=p[3])
+        p[0] = ast.copy_position(ast.BinaryOp(left=p[1], op=p[2], right=p[3]), p[1])
 
 def p_mulop(p):
     '''mulop : oMUL
@@ -203,9 +228,9 @@ def p_lvalue(p):
     '''lvalue : yNAME
               | yNAME oLB expression oRB'''
     if len(p) == 2:
-        p[0] = ast.Variable(name=p[1])
+        p[0] = _at(ast.Variable(name=p[1]), p, 1)
     else:
-        p[0] = ast.ArrayAccess(array=ast.Variable(name=p[1]), index=p[3])
+        p[0] = _at(ast.ArrayAccess(array=_at(ast.Variable(name=p[1]), p, 1), index=p[3]), p, 1)
 
 def p_factor(p):
     '''factor : lvalue
@@ -218,18 +243,18 @@ def p_factor(p):
               | SYS_FUNCT oLP argument_list oRP
               | SYS_FUNCT'''
     if len(p) == 5 and p.slice[1].type == 'SYS_FUNCT':
-        p[0] = ast.FunctionCall(name=p[1], args=p[3])
+        p[0] = _at(ast.FunctionCall(name=p[1], args=p[3]), p, 1)
     elif len(p) == 2:
         if isinstance(p[1], ast.Node):
             p[0] = p[1]
         elif p.slice[1].type == 'cBOO':
-            p[0] = ast.Boolean(value=p[1])
+            p[0] = _at(ast.Boolean(value=p[1]), p, 1)
         elif p.slice[1].type == 'SYS_FUNCT':
-            p[0] = ast.FunctionCall(name=p[1], args=[])
+            p[0] = _at(ast.FunctionCall(name=p[1], args=[]), p, 1)
         else:
-            p[0] = ast.Variable(name=p[1])
+            p[0] = _at(ast.Variable(name=p[1]), p, 1)
     elif len(p) == 3:
-        p[0] = ast.UnaryOp(op=p[1], expr=p[2])
+        p[0] = _at(ast.UnaryOp(op=p[1], expr=p[2]), p, 1)
     elif len(p) == 4:
         p[0] = p[2]
 
@@ -240,15 +265,16 @@ def p_number(p):
         p[0] = ast.Number(value=int(p[1]))
     else:
         p[0] = ast.Number(value=float(p[1]))
+    _at(p[0], p, 1)
 
 
 def p_string(p):
     'string : cSTRING'
-    p[0] = ast.String(value=p[1])
+    p[0] = _at(ast.String(value=p[1]), p, 1)
 
 def p_char_literal(p):
     'char_literal : cCHAR'
-    p[0] = ast.CharLiteral(p[1])
+    p[0] = _at(ast.CharLiteral(p[1]), p, 1)
 
 def p_empty(p):
     'empty :'
@@ -260,31 +286,200 @@ def p_error(p):
     else:
         print("Syntax error at EOF")
 
-parser = yacc.yacc(write_tables=False)
+parser = build_parser(sys.modules[__name__])
+
+def parse_source(data, opt_level=0):
+    """Analisa o código fonte e devolve a AST.
+
+    Em -O1 dobra as constantes, calcula as expressões invariantes antes dos ciclos
+    e as subexpressões repetidas de cada bloco básico uma só vez.
+    """
+    lexer.lineno = 1
+    result = parser.parse(data, lexer=lexer)
+    if result is None:
+        raise SyntaxError("Could not parse source")
+    if opt_level >= 1:
+        result = eliminate_common_subexpressions(hoist_invariants(fold_constants(result)))
+    return result
+
+def generate_code(tree, opt_level=0, range_checks=False):
+    """Gera o código EWVM da AST (com o otimizador peephole em -O1)."""
+    generator = CodeGenerator(range_checks=range_checks)
+    generator.generate(tree)
+    if opt_level >= 1:
+        generator.code = optimize(generator.code)
+    return generator.get_code()
+
+def generate_mapped_code(tree, opt_level=0, range_checks=False):
+    """Como generate_code, mas devolve (código, source map): a posição no fonte de cada instrução."""
+    generator = CodeGenerator(range_checks=range_checks, source_map=True)
+    generator.generate(tree)
+    code, positions = generator.code, generator.get_positions()
+    if opt_level >= 1:
+        code, positions = optimize_with_positions(code, positions)
+    return "\n".join(code), instruction_positions(code, positions)
+
+def write_code(tree, stream, opt_level=0, range_checks=False):
+    """Gera o código EWVM diretamente para `stream`; devolve o nº de instruções.
+
+    Em -O0 as instruções são escritas à medida que são geradas; o otimizador
+    peephole precisa do programa completo, por isso em -O1 é gerado em memória.
+    """
+    if opt_level >= 1:
+        code = generate_code(tree, opt_level, range_checks)
+        stream.write(code)
+        return code.count("\n") + 1
+    generator = CodeGenerator(sink=FileSink(stream), range_checks=range_checks)
+    generator.generate(tree)
+    return len(generator.code)
 
 if __name__ == '__main__':
-    import sys
+    import argparse
+    import os
+
+    arg_parser = argparse.ArgumentParser(description="Compila Pascal Standard para código EWVM.")
+    arg_parser.add_argument('sources', nargs='+', metavar='source',
+                            help="ficheiro .pas ou diretório (vários ativam o modo batch)")
+    arg_parser.add_argument('-O', dest='opt_level', type=int, choices=[0, 1], default=0,
+                            help="nível de otimização (-O1 ativa a dobragem de constantes, a remoção de invariantes dos "
+                                 "ciclos, a eliminação de subexpressões comuns e o otimizador peephole)")
+    arg_parser.add_argument('--range-checks', action='store_true',
+                            help="verifica os índices dos arrays em tempo de execução (exceto quando provadamente válidos)")
+    arg_parser.add_argument('--emit', default='code',
+                            help="saídas separadas por vírgulas: code (código EWVM), bin (o código também no formato "
+                                 "binário .ewvb), dot (grafo da AST em DOT), png (renderiza o .dot com o Graphviz); "
+                                 "por omissão: code")
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help="não usar a cache de compilação (código indexado pelo hash da fonte e do compilador)")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="mede tempo e pico de memória por fase e conta tokens, nós, instruções e labels")
+    arg_parser.add_argument('--profile-format', choices=['text', 'json'], default='text',
+                            help="formato do relatório de --profile (por omissão text)")
+    arg_parser.add_argument('--profile-output', help="ficheiro para o relatório de --profile (por omissão stderr)")
+    arg_parser.add_argument('--stack-report', action='store_true',
+                            help="analisa o código gerado e indica a profundidade máxima da pilha e desequilíbrios")
+    arg_parser.add_argument('--source-map', action='store_true',
+                            help="escreve também output.map.json com a linha e a coluna do fonte de cada instrução")
+    arg_parser.add_argument('-o', '--output-dir',
+                            help="modo batch: diretório onde é escrito <nome>.txt para cada fonte (com os "
+                                 "subdiretórios das fontes dentro dos diretórios dados)")
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help="modo batch: número de processos (por omissão, um por CPU)")
+    args = arg_parser.parse_args()
+    emit = set(args.emit.split(','))
+    unknown = emit - {'code', 'bin', 'dot', 'png'}
+    if unknown:
+        arg_parser.error(f"unknown --emit value(s): {', '.join(sorted(unknown))}")
+    if 'png' in emit:
+        emit.add('dot')
+    if 'bin' in emit:
+        emit.add('code')
+
+    batch = len(args.sources) > 1 or args.output_dir or os.path.isdir(args.sources[0])
+    if batch and args.profile:
+        arg_parser.error("--profile only supports a single source file")
+    if batch and args.stack_report:
+        arg_parser.error("--stack-report only supports a single source file")
+    if batch and args.source_map:
+        arg_parser.error("--source-map only supports a single source file")
+
+    if batch:
+        import time
+        from batch_compile import compile_batch, print_summary
+        started = time.perf_counter()
+        try:
+            results = compile_batch(args.sources, args.output_dir or 'build', jobs=args.jobs,
+                                    opt_level=args.opt_level, emit=emit, use_cache=not args.no_cache,
+                                    range_checks=args.range_checks)
+        except ValueError as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        print_summary(results, time.perf_counter() - started)
+        sys.exit(0 if all(r.error is None for r in results) else 1)
+
+    from compile_cache import CompileCache
+
+    filename = args.sources[0]
     try:
-        filename = sys.argv[1]
         with open(filename, 'r', encoding='utf-8') as file:
             data = file.read()
-        result = parser.parse(data, lexer=lexer)
-        print("\n" + "="*50)
-        print(ast.pretty_print_ast(result))
-        print("\nAST Graph:")
-        dot = result.graphviz()
-        dot.render('ast_graph', format='png', cleanup=True)
-        print("AST graph saved as 'ast_graph.png'")
-        print("\n" + "="*50)
-        generator = CodeGenerator()
-        generator.generate(result)
-        machine_code = generator.get_code()
-        print("Generated Machine Code:")
-        print("="*50)
-        with open('output.txt', 'w', encoding='utf-8') as output_file:
-            output_file.write(machine_code)
-        print("Machine code written to 'output.txt'")
-    except IndexError:
-        print("Error: No input file provided. Usage: python yacc_pas.py <filename>")
     except FileNotFoundError:
-        print(f"Error: File '{sys.argv[1]}' not found.")
+        print(f"Error: File '{filename}' not found.")
+        sys.exit(1)
+    try:
+        if args.profile:
+            from profiling import profile_compile
+            profiler = profile_compile(data, args.opt_level, emit, range_checks=args.range_checks)
+            report = profiler.format_json() if args.profile_format == 'json' else profiler.format_text()
+            if args.profile_output:
+                with open(args.profile_output, 'w', encoding='utf-8') as report_file:
+                    report_file.write(report + "\n")
+            else:
+                print(report, file=sys.stderr)
+            # Segue-se a compilação normal, com todas as saídas pedidas em --emit
+        # A cache só guarda código e AST formatada; o grafo precisa da árvore
+        cache = None if args.no_cache or args.source_map or not emit <= {'code', 'bin'} else CompileCache()
+        entry = None
+        if cache is not None:
+            key = cache.key(data, args.opt_level, args.range_checks)
+            entry = cache.get(key, need_ast=True)
+        if entry is not None:
+            ast_text = entry.ast_text
+        else:
+            result = parse_source(data, args.opt_level)
+            ast_text = ast.format_ast(result)
+        print("\n" + "="*50)
+        print(ast_text)
+        if 'dot' in emit:
+            with open('ast_graph.dot', 'w', encoding='utf-8') as dot_file:
+                ast.write_dot(result, dot_file)
+            print("\nAST graph saved as 'ast_graph.dot'")
+        if 'png' in emit:
+            ast.render_dot('ast_graph.dot', 'png')
+            print("AST graph rendered as 'ast_graph.png'")
+        if 'code' in emit:
+            print("\n" + "="*50)
+            print("Generated Machine Code:")
+            print("="*50)
+            if entry is not None:
+                with open('output.txt', 'w', encoding='utf-8') as output_file:
+                    output_file.write(entry.code)
+                print("Machine code written to 'output.txt' (from compile cache)")
+            elif args.source_map:
+                import source_map
+                code, mappings = generate_mapped_code(result, args.opt_level, args.range_checks)
+                with open('output.txt', 'w', encoding='utf-8') as output_file:
+                    output_file.write(code)
+                with open('output.map.json', 'w', encoding='utf-8') as map_file:
+                    source_map.dump(mappings, map_file, source=filename)
+                print("Machine code written to 'output.txt' (source map in 'output.map.json')")
+            else:
+                with open('output.txt', 'w', encoding='utf-8') as output_file:
+                    write_code(result, output_file, args.opt_level, args.range_checks)
+                if cache is not None:
+                    cache.put(key, code_file='output.txt', ast_text=ast_text)
+                print("Machine code written to 'output.txt'")
+            if 'bin' in emit:
+                import ewvm_binary
+                with open('output.txt', 'r', encoding='utf-8') as output_file:
+                    binary = ewvm_binary.encode(output_file.read())
+                with open('output.ewvb', 'wb') as binary_file:
+                    binary_file.write(binary)
+                print("Binary machine code written to 'output.ewvb'")
+            if args.stack_report:
+                from stack_analysis import analyze_stack
+                with open('output.txt', 'r', encoding='utf-8') as output_file:
+                    stack_report = analyze_stack(output_file.read())
+                print("\n" + stack_report.format_text())
+                if not stack_report.balanced:
+                    sys.exit(1)
+    except SyntaxError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    except (TypeError, ValueError) as error:
+        # Erros semânticos: a posição vem de semantic._locate (quando a AST a tem)
+        if getattr(error, 'lineno', None) is not None:
+            print(f"{filename}:{error.lineno}:{error.column}: {error.message}")
+        else:
+            print(f"{filename}: {error}")
+        sys.exit(1)